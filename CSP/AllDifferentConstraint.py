@@ -0,0 +1,214 @@
+class AllDifferentConstraint:
+
+    # Constructor
+    # A global constraint that all of its variables take different values. It is propagated with
+    # Regin's matching-based filtering, which removes every value that cannot be part of any solution
+    # of the constraint, e.g. it fails as soon as k variables have fewer than k values between them
+    # @variables the list of integers corresponding to the variables involved in the constraint
+    # @redundant whether binary constraints already enforce it, so it only adds propagation on top of them
+    def __init__(self, variables, redundant=False):
+        self.variables = list(variables)
+        self.redundant = redundant
+
+        # The last maximum matching found (variable -> value), used as a starting point for the next one
+        self.matching = {}
+
+    # Checks to see if a specific variable is involved in the constraint
+    def involves(self, var):
+        return var in self.variables
+
+    # Takes a variable out of the constraint
+    def remove_variable(self, var):
+        self.variables.remove(var)
+        self.matching.pop(var, None)
+
+    # Checks to see if the assigned variables of the assignment all have different values
+    def is_satisfied(self, assignment):
+        seen = set()
+        for var in self.variables:
+            value = assignment[var]
+            if value is not None:
+                if value in seen:
+                    return False
+                seen.add(value)
+        return True
+
+    # Removes the values of the variables' domains that are not in any maximum matching between the
+    # variables and their values. Returns the list of variables whose domains changed, or None if
+    # the variables cannot all take different values
+    def propagate(self, csp):
+        domains = {}
+        for var in self.variables:
+            domains[var] = list(csp.variable_values[var])
+
+        matching = self.maximum_matching(domains)
+        if matching is None:
+            return None
+        self.matching = matching
+
+        # Directed graph of the matching: var -> matched value, and value -> var for every other value of var
+        # (nodes are ('x', var) and ('v', value))
+        matched_var = {}
+        for var in matching:
+            matched_var[matching[var]] = var
+
+        edges = {}
+        for var in self.variables:
+            edges[("x", var)] = [("v", matching[var])]
+            for value in domains[var]:
+                if value != matching[var]:
+                    edges.setdefault(("v", value), []).append(("x", var))
+        for value in matched_var:
+            edges.setdefault(("v", value), [])
+
+        components = strongly_connected_components(edges)
+
+        # Values reachable from a free (unmatched) value lie on an even alternating path and are kept
+        reachable = set()
+        stack = [node for node in edges if node[0] == "v" and node[1] not in matched_var]
+        while len(stack) > 0:
+            node = stack.pop()
+            if node in reachable:
+                continue
+            reachable.add(node)
+            stack.extend(edges.get(node, []))
+
+        changed = []
+        for var in self.variables:
+            removed = False
+            for value in domains[var]:
+                if value == matching[var]:
+                    continue
+                if ("v", value) in reachable:
+                    continue
+                if components[("v", value)] == components[("x", var)]:
+                    continue
+                csp.remove_from_domain(var, value)
+                removed = True
+            if removed:
+                changed.append(var)
+
+        return changed
+
+    # Finds a maximum matching between the variables and their values with augmenting paths, starting from
+    # the still-valid part of the last matching. Returns None if some variable cannot be matched
+    def maximum_matching(self, domains):
+        matching = {}
+        matched_var = {}
+        for var in self.variables:
+            value = self.matching.get(var)
+            if value is not None and value not in matched_var and value in domains[var]:
+                matching[var] = value
+                matched_var[value] = var
+
+        for var in self.variables:
+            if var not in matching and not self.augment(var, domains, matching, matched_var):
+                return None
+
+        return matching
+
+    # Searches (iteratively) for an alternating path from an unmatched variable to a free value and flips it
+    def augment(self, start, domains, matching, matched_var):
+        parent = {start: None}
+        queue = [start]
+
+        for var in queue:
+            for value in domains[var]:
+                if value not in matched_var:
+                    # Flip the matching along the path back to the start
+                    while var is not None:
+                        previous = matching.get(var)
+                        matching[var] = value
+                        matched_var[value] = var
+                        value = previous
+                        var = parent[var]
+                    return True
+
+                next_var = matched_var[value]
+                if next_var not in parent:
+                    parent[next_var] = var
+                    queue.append(next_var)
+
+        return False
+
+    def __str__(self):
+        return "{AllDifferent: " + str(self.variables) + "}"
+
+# Tarjan's strongly connected components algorithm, written iteratively
+# @edges the graph as a dictionary from each node to the list of its successors
+# Returns a dictionary from each node to the index of its component
+def strongly_connected_components(edges):
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    components = {}
+    counter = 0
+
+    for root in edges:
+        if root in index:
+            continue
+
+        work = [(root, 0)]
+        while len(work) > 0:
+            node, i = work.pop()
+            if i == 0:
+                index[node] = counter
+                low[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack.add(node)
+
+            successors = edges.get(node, [])
+            recurse = False
+            while i < len(successors):
+                successor = successors[i]
+                i += 1
+                if successor not in index:
+                    work.append((node, i))
+                    work.append((successor, 0))
+                    recurse = True
+                    break
+                if successor in on_stack:
+                    low[node] = min(low[node], index[successor])
+            if recurse:
+                continue
+
+            # All successors are done: close the component if node is its root, then return to the parent
+            if low[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    components[member] = index[node]
+                    if member == node:
+                        break
+            if len(work) > 0:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+
+    return components
+
+# Greedily finds cliques of at least min_size variables in a graph (e.g. groups of mutually bordering countries).
+# Every variable starts a clique with its neighbors that come later in the variable order, adding the
+# candidates with the most neighbors among the other candidates first
+# @connections the list of neighbors of each variable
+def find_cliques(connections, min_size=3):
+    neighbor_sets = [set(neighbors) for neighbors in connections]
+    cliques = []
+    seen = set()
+
+    for var in range(len(connections)):
+        candidates = [neighbor for neighbor in neighbor_sets[var] if neighbor > var]
+        candidates.sort(key=lambda c: (-len(neighbor_sets[c].intersection(candidates)), c))
+
+        clique = [var]
+        for candidate in candidates:
+            if all(member in neighbor_sets[candidate] for member in clique):
+                clique.append(candidate)
+
+        key = frozenset(clique)
+        if len(clique) >= min_size and key not in seen:
+            seen.add(key)
+            cliques.append(sorted(clique))
+
+    return cliques
@@ -0,0 +1,58 @@
+class BitsetDomain:
+
+    # Constructor
+    # A reversible domain stored as an integer bitmask over the initial values: bit i is set
+    # if self.values[i] is still in the domain. Pruning against support masks is then a single AND/ANDNOT.
+    # @values the initial values of the domain
+    def __init__(self, values):
+        self.values = list(values)
+        self.positions = {}
+        for i in range(0, len(self.values)):
+            self.positions[self.values[i]] = i
+        self.mask = (1 << len(self.values)) - 1
+
+    def __len__(self):
+        return self.mask.bit_count()
+
+    def __contains__(self, value):
+        pos = self.positions.get(value)
+        return pos is not None and (self.mask >> pos) & 1 == 1
+
+    # Iterates over the set bits of the mask at the time iteration starts
+    def __iter__(self):
+        mask = self.mask
+        while mask:
+            low = mask & -mask
+            yield self.values[low.bit_length() - 1]
+            mask ^= low
+
+    # Returns the bit representing the value in this domain's masks
+    def bit(self, value):
+        return 1 << self.positions[value]
+
+    # Removes a value by clearing its bit
+    def remove(self, value):
+        self.mask &= ~self.bit(value)
+
+    # Reduces the domain to the single specified value
+    def reduce_to(self, value):
+        self.mask = self.bit(value)
+
+    # Keeps only the values whose bits are set in the mask (AND)
+    def intersect(self, mask):
+        self.mask &= mask
+
+    # Removes the values whose bits are set in the mask (ANDNOT)
+    def difference(self, mask):
+        self.mask &= ~mask
+
+    # Returns the state needed to undo later changes to the domain
+    def save(self):
+        return self.mask
+
+    # Restores the domain to a previously saved state
+    def restore(self, state):
+        self.mask = state
+
+    def __repr__(self):
+        return str(tuple(self))
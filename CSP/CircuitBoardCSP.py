@@ -1,10 +1,20 @@
 # author: Angela Li
 # date: 10/17/17
 
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from BoardPiece import BoardPiece
 from Constraint import Constraint
+from IntensionalConstraint import LessThanConstraint, NoOverlapConstraint, OrderedNoOverlapConstraint
+from PackingConstraint import PackingConstraint
 from ConstraintSatisfactionProblem import ConstraintSatisfactionProblem
-from backtracking_search import backtracking_search
+from backtracking_search import repair, solve
+from model_file import file_digest, load_model, model_symmetry
 
 class CircuitBoardCSP:
 
@@ -13,7 +23,21 @@ class CircuitBoardCSP:
     # @self.domains a list of sets of valid bottom-left corner values for each Piece
     # @self.constraints a list of Constraints between each variable
     # @self.connections the hashtable of connections for each Piece
-    def __init__(self, board_filename):
+    # @bitset whether the underlying CSP stores its domains as bitmasks
+    # @extensional whether to build each constraint's list of allowable position pairs instead of a no-overlap relation
+    # @packing whether to use a single PackingConstraint over occupancy bitmasks instead of binary constraints
+    #   between every pair of pieces
+    # @symmetry whether to break the symmetry of identical pieces, by placing each one at a higher position than
+    #   the identical pieces before it, so that only one of the solutions that swap them around is found
+    # @build whether to build the domains, the constraints and the CSP (self.int_csp), or only read the board,
+    #   e.g. to look its solution up in a cache (see 'caching.py') or to print a solution
+    # @model optional model file compiled from this board (see 'model_file.py'), which is loaded instead of
+    #   generating the domains and constraints. It holds the constraints it was compiled with, so only the bitset
+    #   option applies (the symmetry is broken if it was when the model was compiled), and the board cannot be
+    #   changed
+    def __init__(self, board_filename, bitset=False, extensional=False, packing=True, symmetry=False, build=True,
+                 model=None):
+        start = time.perf_counter()
         self.board_n = 0
         self.board_m = 0
         self.variables = []
@@ -21,6 +45,12 @@ class CircuitBoardCSP:
         self.constraint_pairs = []
         self.constraints = []
         self.connections = []
+        self.global_constraints = []
+        self.extensional = extensional
+        self.packing = packing
+        self.symmetry = symmetry
+        self.identical_groups = []
+        self.ordered_pairs = set()
 
         f = open(board_filename)
         line_num = 0
@@ -55,12 +85,126 @@ class CircuitBoardCSP:
         last_piece = BoardPiece(prev_char, len(prev_line), rows)
         self.variables.append(last_piece)
 
-        self.generate_domains()
-        self.generate_connections()
-        self.generate_constraint_pairs()
-        self.generate_all_constraints()
+        # The CSP (only built with build=True), and the last solution found, which repair() starts from after
+        # the board is changed
+        self.int_csp = None
+        self.last_solution = None
+        self.model = model
+        if not build:
+            return
+
+        if model is not None:
+            self.symmetry = model_symmetry(model)
+            if self.symmetry:
+                self.find_identical_pieces()
+            self.int_csp = load_model(model, bitset, file_digest(board_filename))
+            self.connections = self.int_csp.var_connections
+            self.constraints = self.int_csp.constraints
+            self.global_constraints = self.int_csp.global_constraints
+            self.int_csp.stats.build_time = time.perf_counter() - start
+            return
 
-        self.int_csp = ConstraintSatisfactionProblem(len(self.variables), self.connections, self.domains, self.constraints)
+        self.generate_domains()
+        if symmetry:
+            self.find_identical_pieces()
+        if packing:
+            self.connections = [[] for piece in self.variables]
+            self.global_constraints.append(self.generate_packing_constraint())
+            self.generate_ordering_constraints()
+        else:
+            self.generate_connections()
+            self.generate_constraint_pairs()
+            self.generate_all_constraints()
+
+        self.int_csp = ConstraintSatisfactionProblem(len(self.variables), self.connections, self.domains,
+                                                     self.constraints, bitset, self.global_constraints)
+        self.int_csp.stats.build_time = time.perf_counter() - start
+
+    # Changing the board. Pieces can be added, removed, resized and pinned after the model is built, and repair()
+    # then re-solves it from the last solution (see 'repair' in 'backtracking_search.py'). Only the domain and the
+    # constraints of the piece that changed are rebuilt. Removed pieces keep their index in the solutions, with
+    # the value None. The symmetry breaking is tied to the pieces' dimensions, so boards built with symmetry=True
+    # cannot be changed
+
+    # Adds a piece, and returns its index
+    def add_piece(self, char, n, m):
+        self.check_changeable()
+        piece = BoardPiece(char, n, m)
+        domain = self.generate_domain(piece)
+        self.variables.append(piece)
+        self.domains.append(domain)
+        var = self.int_csp.add_variable(domain)
+
+        if self.packing:
+            self.packing_constraint().set_piece(var, self.piece_placements(var), n * m)
+            self.int_csp.index_global_constraints()
+        else:
+            for j in range(var):
+                if j not in self.int_csp.removed_variables:
+                    self.add_pair_constraint((var, j))
+        return var
+
+    # Removes a piece from the board
+    def remove_piece(self, index):
+        self.check_changeable()
+        self.constraint_pairs = [pair for pair in self.constraint_pairs if index not in pair]
+        self.int_csp.remove_variable(index)
+
+    # Changes the dimensions of a piece
+    def resize_piece(self, index, n, m):
+        self.check_changeable()
+        self.variables[index] = BoardPiece(self.variables[index].getChar(), n, m)
+        self.domains[index] = self.generate_domain(self.variables[index])
+
+        # The constraints on the piece are taken out while its domain changes, so their support masks are only
+        # built once, for the new domain
+        pairs = [constraint.variable_pair for constraint in self.int_csp.var_constraints[index]]
+        for constraint in list(self.int_csp.var_constraints[index]):
+            self.int_csp.remove_constraint(constraint)
+        self.int_csp.set_domain(index, self.domains[index])
+        for pair in pairs:
+            self.int_csp.add_constraint(self.generate_constraint(pair))
+
+        if self.packing:
+            self.packing_constraint().set_piece(index, self.piece_placements(index), n * m)
+
+    # Fixes the position of a piece
+    def pin_piece(self, index, pos):
+        self.check_changeable()
+        if pos not in self.domains[index]:
+            raise ValueError(str(self.variables[index]) + " does not fit at position " + str(pos))
+        self.int_csp.set_domain(index, (pos,))
+
+    # Lets a pinned piece take any position again
+    def unpin_piece(self, index):
+        self.check_changeable()
+        self.int_csp.set_domain(index, self.domains[index])
+
+    # Fails if the board was loaded from a compiled model or built with its symmetry broken
+    def check_changeable(self):
+        if self.model is not None:
+            raise ValueError("A board loaded from a compiled model cannot be changed")
+        if len(self.identical_groups) > 0:
+            raise ValueError("The board cannot be changed when the symmetry of identical pieces is broken")
+
+    # Adds the constraint on a pair of pieces (later piece, earlier piece)
+    def add_pair_constraint(self, pair):
+        self.constraint_pairs.append(pair)
+        self.int_csp.add_constraint(self.generate_constraint(pair))
+
+    # Returns the PackingConstraint of the board
+    def packing_constraint(self):
+        for constraint in self.global_constraints:
+            if isinstance(constraint, PackingConstraint):
+                return constraint
+        return None
+
+    # Re-solves the board after it was changed, starting from the last solution, and returns the new solution.
+    # The search configuration is passed on to repair() in 'backtracking_search.py'
+    def repair(self, select="dom_wdeg", order="random", inference="fc", seed=None, backjump=False):
+        self.last_solution = repair(self.int_csp, self.last_solution or [], select, order, inference, seed,
+                                    backjump)
+        return self.last_solution
 
     # Converts coordinates (x, y) into an integer representation of a location on the board
     # e.g. a board *** is represented as 345
@@ -89,26 +233,76 @@ class CircuitBoardCSP:
             self.domains.append(self.generate_domain(piece))
 
     def generate_connections(self):
-        for piece in self.variables:
-            list_copy = list(self.variables)
-            list_copy.remove(piece)
-
+        for i in range(len(self.variables)):
             index_list = []
-            for var in list_copy:
-                index_list.append(self.variables.index(var))
+            for j in range(len(self.variables)):
+                if j != i:
+                    index_list.append(j)
 
             self.connections.append(index_list)
 
     def generate_constraint_pairs(self):
-        variables_copy = list(self.variables)
-
-        while len(variables_copy) > 1:
-            var = variables_copy.pop()
-            var_index = self.variables.index(var)
-
-            for remaining in variables_copy:
-                remaining_index = self.variables.index(remaining)
-                self.constraint_pairs.append((var_index, remaining_index))
+        for i in range(len(self.variables) - 1, 0, -1):
+            for j in range(i):
+                self.constraint_pairs.append((i, j))
+
+    # Groups the pieces with the same dimensions, which can swap places in any solution, and records the pairs
+    # (later piece, earlier piece) of consecutive identical pieces that are ordered to break the symmetry
+    def find_identical_pieces(self):
+        groups = {}
+        for i in range(len(self.variables)):
+            piece = self.variables[i]
+            groups.setdefault((piece.getN(), piece.getM()), []).append(i)
+
+        for group in groups.values():
+            if len(group) > 1:
+                self.identical_groups.append(group)
+                for k in range(1, len(group)):
+                    self.ordered_pairs.add((group[k], group[k - 1]))
+
+    # Generates the constraints that order the positions of consecutive identical pieces, when the pieces don't
+    # have binary constraints between them to carry the ordering
+    def generate_ordering_constraints(self):
+        for pair in sorted(self.ordered_pairs):
+            self.constraints.append(LessThanConstraint((pair[1], pair[0])))
+            self.connections[pair[0]].append(pair[1])
+            self.connections[pair[1]].append(pair[0])
+
+    # Returns the number of solutions that a solution stands for: with the symmetry broken, every solution
+    # is found once for all the ways of swapping its identical pieces around
+    def orbit_size(self, solution):
+        size = 1
+        for group in self.identical_groups:
+            for k in range(2, len(group) + 1):
+                size *= k
+        return size
+
+    # Returns the mask of the board cells (bit i for the position i) that a piece covers when placed at pos
+    def placement_mask(self, piece, pos):
+        row_mask = (1 << piece.getN()) - 1
+
+        mask = 0
+        for i in range(piece.getM()):
+            mask |= row_mask << (pos + i * self.board_n)
+        return mask
+
+    # Generates the PackingConstraint over all the pieces, with the occupancy masks of all their placements
+    def generate_packing_constraint(self):
+        placements = []
+        areas = []
+        for i in range(len(self.variables)):
+            piece = self.variables[i]
+            placements.append(self.piece_placements(i))
+            areas.append(piece.getN() * piece.getM())
+
+        return PackingConstraint(range(len(self.variables)), placements, areas, self.board_n * self.board_m)
+
+    # Returns the occupancy mask of each placement of a piece
+    def piece_placements(self, index):
+        masks = {}
+        for pos in self.domains[index]:
+            masks[pos] = self.placement_mask(self.variables[index], pos)
+        return masks
 
     # Generates a list of positions (integer representation) that a piece covers on a board
     def piece_coverage(self, piece, pos):
@@ -135,18 +329,66 @@ class CircuitBoardCSP:
         piece1 = self.variables[constraint_pair[0]]
         piece2 = self.variables[constraint_pair[1]]
 
-        domain1 = self.domains[constraint_pair[0]]
-        domain2 = self.domains[constraint_pair[1]]
+        ordered = constraint_pair in self.ordered_pairs
+        if not self.extensional:
+            if ordered:
+                return OrderedNoOverlapConstraint(constraint_pair, piece1, piece2, self.board_n)
+            return NoOverlapConstraint(constraint_pair, piece1, piece2, self.board_n)
+
+        if numpy is not None:
+            legal_values = self.legal_positions_numpy(constraint_pair)
+        else:
+            legal_values = self.legal_positions(piece1, piece2)
+        if ordered:
+            legal_values = [pair for pair in legal_values if pair[0] > pair[1]]
+
+        return Constraint(constraint_pair, legal_values)
+
+    # Generates all the non-overlapping position pairs of two pieces from their corner coordinates and dimensions.
+    # For each x1, the x2's that are clear of piece1 horizontally are computed once; then for each y2, piece2 can
+    # take every x2 if its rows are clear of piece1, and only the clear x2's otherwise
+    def legal_positions(self, piece1, piece2):
+        n1 = piece1.getN()
+        m1 = piece1.getM()
+        n2 = piece2.getN()
+        m2 = piece2.getM()
+
+        xs2 = range(self.board_n - n2 + 1)
+        ys2 = range(self.board_m - m2 + 1)
 
         legal_values = []
+        for x1 in range(self.board_n - n1 + 1):
+            clear_xs2 = [x2 for x2 in xs2 if x2 + n2 <= x1 or x1 + n1 <= x2]
 
-        for pos1 in domain1:
-            for pos2 in domain2:
-                if pos1 != pos2:
-                    if not self.overlap(piece1, pos1, piece2, pos2):
-                        legal_values.append((pos1, pos2))
+            for y1 in range(self.board_m - m1 + 1):
+                pos1 = self.convert_coordinates(x1, y1)
 
-        return Constraint(constraint_pair, legal_values)
+                for y2 in ys2:
+                    row = self.board_n * y2
+                    if y2 + m2 <= y1 or y1 + m1 <= y2:
+                        legal_values.extend([(pos1, row + x2) for x2 in xs2])
+                    else:
+                        legal_values.extend([(pos1, row + x2) for x2 in clear_xs2])
+
+        return legal_values
+
+    # Same as legal_positions, vectorized with NumPy over the two domains
+    def legal_positions_numpy(self, constraint_pair):
+        piece1 = self.variables[constraint_pair[0]]
+        piece2 = self.variables[constraint_pair[1]]
+        domain1 = numpy.array(self.domains[constraint_pair[0]])
+        domain2 = numpy.array(self.domains[constraint_pair[1]])
+
+        x1 = (domain1 % self.board_n)[:, None]
+        y1 = (domain1 // self.board_n)[:, None]
+        x2 = (domain2 % self.board_n)[None, :]
+        y2 = (domain2 // self.board_n)[None, :]
+
+        legal = ((x1 + piece1.getN() <= x2) | (x2 + piece2.getN() <= x1) |
+                 (y1 + piece1.getM() <= y2) | (y2 + piece2.getM() <= y1))
+        rows, cols = numpy.nonzero(legal)
+
+        return list(zip(domain1[rows].tolist(), domain2[cols].tolist()))
 
     # Generates all the constraints for all constraint pairs
     def generate_all_constraints(self):
@@ -160,13 +402,26 @@ class CircuitBoardCSP:
 
         return (col, row)
 
-    def solution(self):
-        result = backtracking_search(self.int_csp)
+    # Prints the board with the pieces placed according to the solution of the backtracking search
+    # The search configuration is passed on to solve() in 'backtracking_search.py'
+    def solution(self, select="chronological", order="random", inference="none", seed=None, restarts=None,
+                 backjump=False):
+        self.last_solution = solve(self.int_csp, select, order, inference, seed, restarts, backjump)
+        self.print_solution(self.last_solution)
+
+    # Prints the board with the pieces placed according to a solution (a list of positions), or None
+    def print_solution(self, result):
+        if result is None:
+            print("No solution")
+            return
 
         board = [["."]*self.board_n for _ in range(self.board_m)]
 
-        for piece in self.variables:
-            cover = self.piece_coverage(piece, result[self.variables.index(piece)])
+        for i in range(len(self.variables)):
+            if result[i] is None:
+                continue
+            piece = self.variables[i]
+            cover = self.piece_coverage(piece, result[i])
             for pos in cover:
                 coordinates = self.convert_to_coordinates(pos)
                 board[int(coordinates[0])][int(coordinates[1])] = piece.getChar()
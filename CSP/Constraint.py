@@ -8,9 +8,34 @@ class Constraint:
     # @values the list of allowable combinations of values for that pair of variables
     def __init__(self, var_pair, values):
         self.variable_pair = var_pair
-        self.values = values
+        self.values = set(values)
         self.inverse = (self.variable_pair[1], self.variable_pair[0])
 
+        # Support tables: value of one variable -> set of allowed values of the other variable
+        self.supports = {}
+        self.inverse_supports = {}
+        self.generate_supports()
+
+    # Builds the support tables in both directions from the allowed value pairs
+    def generate_supports(self):
+        for value_pair in self.values:
+            value1 = value_pair[0]
+            value2 = value_pair[1]
+            self.supports.setdefault(value1, set()).add(value2)
+            self.inverse_supports.setdefault(value2, set()).add(value1)
+
+    # Returns the set of values of the other variable that are allowed when var takes value
+    def get_supports(self, var, value):
+        if var == self.variable_pair[0]:
+            return self.supports.get(value, ())
+        return self.inverse_supports.get(value, ())
+
+    # Checks to see if a value for var1 and a value for var2 are allowed together
+    def allows(self, var1, value1, value2):
+        if var1 == self.variable_pair[0]:
+            return (value1, value2) in self.values
+        return (value2, value1) in self.values
+
     # Checks to see if the assignment satisfies the constraint '
     def is_satisfied(self, assignment):
         var1 = self.variable_pair[0]
@@ -28,5 +53,5 @@ class Constraint:
         return var in self.variable_pair
 
     def __str__(self):
-        s = "{" + str(self.variable_pair) + ": " + str(self.values) + "}"
-        return s
\ No newline at end of file
+        s = "{" + str(self.variable_pair) + ": " + str(sorted(self.values)) + "}"
+        return s
@@ -1,17 +1,242 @@
 # author: Angela Li
 # date: 10/17/17
 
+from collections import deque
+
+from BitsetDomain import BitsetDomain
+from Domain import Domain
+from SearchStats import SearchStats
+
 class ConstraintSatisfactionProblem:
 
     # Constructor
-    def __init__(self, num_variables, var_connections, variable_values, constraints):
+    # @bitset whether to store the domains as bitmasks (see BitsetDomain) instead of sparse sets
+    # @global_constraints optional list of constraints on more than two variables, e.g. AllDifferentConstraint,
+    #   which are propagated by forward checking, MAC and at the root of the search
+    def __init__(self, num_variables, var_connections, variable_values, constraints, bitset=False,
+                 global_constraints=None):
         self.num_var = num_variables
+        self.bitset = bitset
         self.var_connections = var_connections
         self.unassigned_variables = self.create_unassigned()
-        self.variable_values = variable_values
+        self.variable_values = self.create_domains(variable_values)
         self.constraints = constraints
+        self.global_constraints = global_constraints
+        if self.global_constraints is None:
+            self.global_constraints = []
         self.assignment = self.initialize_assignment()
 
+        # Trail of domain changes, used to undo them on backtrack: (domain or other object, saved state, variable or None)
+        self.trail = []
+
+        # Counters of the work done by the search and inference, and the optional trace sink
+        # that is called with each search event (see SearchStats.print_trace)
+        self.stats = SearchStats()
+        self.trace = None
+
+        # Optional variable selection state (see DomWdeg) that is told about every domain change and assignment,
+        # and the constraint weights it had learned when it was last dropped (see check_editable)
+        self.var_heuristic = None
+        self.learned_weights = None
+
+        # The last failure: (variable, constraint) of the rejected assignment or of the wipeout.
+        # Conflict-directed backjumping uses it to find the variables to blame for the failure
+        self.conflict = None
+
+        # Index of the constraints on each variable, and of the constraint on each ordered pair of variables
+        self.var_constraints = []
+        self.constraint_index = {}
+        self.index_constraints()
+
+        # Index of the global constraints on each variable (as indices into self.global_constraints)
+        self.var_globals = []
+        self.index_global_constraints()
+
+        # Variables taken out of the problem with remove_variable. They keep their index, but are never assigned
+        self.removed_variables = set()
+
+        # Residual supports for MAC: (var1, value1, var2) -> the last value of var2 found to support value1.
+        # They are only hints that are checked before searching for a new support, so they are not undone on backtrack
+        self.residues = {}
+
+        # Masks of the supports of each value on each arc, used for pruning bitset domains
+        self.support_masks = {}
+        if self.bitset:
+            self.generate_support_masks()
+
+    # Builds the variable-to-constraint adjacency index. Both orientations of a variable pair
+    # map to the same Constraint, which handles the orientation itself (see Constraint.get_supports)
+    def index_constraints(self):
+        for i in range(0, self.num_var):
+            self.var_constraints.append([])
+
+        for constraint in self.constraints:
+            var1 = constraint.variable_pair[0]
+            var2 = constraint.variable_pair[1]
+            self.var_constraints[var1].append(constraint)
+            if var2 != var1:
+                self.var_constraints[var2].append(constraint)
+            self.constraint_index[(var1, var2)] = constraint
+            self.constraint_index[(var2, var1)] = constraint
+
+    # Builds (or rebuilds) the variable-to-global-constraint index
+    def index_global_constraints(self):
+        self.var_globals = []
+        for i in range(0, self.num_var):
+            self.var_globals.append([])
+
+        for i in range(len(self.global_constraints)):
+            for var in self.global_constraints[i].variables:
+                self.var_globals[var].append(i)
+
+    # Precomputes, for every arc (var, neighbor) and every value of var, the mask of the neighbor's
+    # values that support it
+    def generate_support_masks(self):
+        for arc in self.constraint_index:
+            self.generate_arc_masks(arc)
+
+    # Precomputes the support masks of one arc (var, neighbor)
+    def generate_arc_masks(self, arc):
+        var = arc[0]
+        neighbor = arc[1]
+        constraint = self.constraint_index[arc]
+        neighbor_domain = self.variable_values[neighbor]
+
+        # Constraints loaded from a compiled model (see 'model_file.py') already hold the masks
+        if hasattr(constraint, "support_masks"):
+            masks = constraint.support_masks(var, self.variable_values[var].values, neighbor_domain.values)
+            if masks is not None:
+                self.support_masks[arc] = masks
+                return
+
+        masks = {}
+        for value in self.variable_values[var]:
+            supports = constraint.get_supports(var, value)
+            mask = 0
+            for neighbor_value in neighbor_domain:
+                if neighbor_value in supports:
+                    mask |= neighbor_domain.bit(neighbor_value)
+            masks[value] = mask
+
+        self.support_masks[arc] = masks
+
+    # Wraps each variable's values in a reversible Domain (or BitsetDomain)
+    def create_domains(self, variable_values):
+        domains = []
+        for values in variable_values:
+            domains.append(self.create_domain(values))
+        return domains
+
+    def create_domain(self, values):
+        if self.bitset:
+            return BitsetDomain(values)
+        return Domain(values)
+
+    # Changing the problem. The model can be edited between searches (not during one): everything that is built
+    # from it (the constraint index, the support masks and the residues) is updated for the parts that changed only,
+    # and the variable selection state, which depends on all of it, is dropped and rebuilt by the next search.
+    # 'repair' in 'backtracking_search.py' then re-solves starting from the previous solution
+
+    # Fails if a search is under way, since its trail refers to the current model. Otherwise drops the variable
+    # selection state, keeping the constraint weights it learned for the next one
+    def check_editable(self):
+        if len(self.trail) > 0:
+            raise ValueError("The problem cannot be changed during a search")
+        if self.var_heuristic is not None:
+            self.learned_weights = self.var_heuristic.weights
+            self.var_heuristic = None
+
+    # Adds a variable with the given values, and returns its index
+    def add_variable(self, values):
+        self.check_editable()
+        var = self.num_var
+        self.num_var += 1
+        self.variable_values.append(self.create_domain(values))
+        self.var_connections.append([])
+        self.var_constraints.append([])
+        self.var_globals.append([])
+        self.assignment.append(None)
+        self.unassigned_variables.add(var)
+        return var
+
+    # Takes a variable out of the problem: its constraints are removed, it is dropped from the global constraints
+    # (see their remove_variable methods) and it is no longer assigned by the search (its value in the solutions
+    # is None). The other variables keep their indices
+    def remove_variable(self, var):
+        self.check_editable()
+        for constraint in list(self.var_constraints[var]):
+            self.remove_constraint(constraint)
+        for i in self.var_globals[var]:
+            self.global_constraints[i].remove_variable(var)
+        self.index_global_constraints()
+
+        self.removed_variables.add(var)
+        self.unassigned_variables.discard(var)
+        self.assignment[var] = None
+
+    # Replaces the values of a variable, e.g. to pin it to a single value or to change its possible values
+    def set_domain(self, var, values):
+        self.check_editable()
+        self.variable_values[var] = self.create_domain(values)
+
+        # The bits of the variable's values changed, so the masks of both arcs of its constraints are rebuilt
+        if self.bitset:
+            for constraint in self.var_constraints[var]:
+                pair = constraint.variable_pair
+                self.generate_arc_masks(pair)
+                self.generate_arc_masks((pair[1], pair[0]))
+
+    # Adds a binary constraint between two variables that don't have one yet
+    def add_constraint(self, constraint):
+        self.check_editable()
+        var1 = constraint.variable_pair[0]
+        var2 = constraint.variable_pair[1]
+        if (var1, var2) in self.constraint_index:
+            raise ValueError("There is already a constraint between " + str(var1) + " and " + str(var2))
+
+        self.constraints.append(constraint)
+        self.var_constraints[var1].append(constraint)
+        self.var_constraints[var2].append(constraint)
+        self.constraint_index[(var1, var2)] = constraint
+        self.constraint_index[(var2, var1)] = constraint
+        self.var_connections[var1].append(var2)
+        self.var_connections[var2].append(var1)
+
+        if self.bitset:
+            self.generate_arc_masks((var1, var2))
+            self.generate_arc_masks((var2, var1))
+
+    # Removes a binary constraint, along with the support masks and residues of its arcs
+    def remove_constraint(self, constraint):
+        self.check_editable()
+        var1 = constraint.variable_pair[0]
+        var2 = constraint.variable_pair[1]
+
+        self.constraints.remove(constraint)
+        self.var_constraints[var1].remove(constraint)
+        self.var_constraints[var2].remove(constraint)
+        for arc in ((var1, var2), (var2, var1)):
+            self.constraint_index.pop(arc, None)
+            self.support_masks.pop(arc, None)
+        self.var_connections[var1].remove(var2)
+        self.var_connections[var2].remove(var1)
+
+        # The residues are only valid supports for the constraint they were found for
+        self.residues = {key: value for key, value in self.residues.items()
+                         if not ((key[0] == var1 and key[2] == var2) or (key[0] == var2 and key[2] == var1))}
+
+    # Adds a global constraint
+    def add_global_constraint(self, constraint):
+        self.check_editable()
+        self.global_constraints.append(constraint)
+        self.index_global_constraints()
+
+    # Removes a global constraint
+    def remove_global_constraint(self, constraint):
+        self.check_editable()
+        self.global_constraints.remove(constraint)
+        self.index_global_constraints()
+
     # Initializing the assignment array
     def initialize_assignment(self):
         asn = []
@@ -33,64 +258,186 @@ class ConstraintSatisfactionProblem:
     # Changes a specific variable's status back to unassigned
     def replace_unassigned(self, var):
         self.unassigned_variables.add(var)
+        if self.var_heuristic is not None:
+            self.var_heuristic.unassigned(var)
 
     def is_consistent(self, assignment, value, var):
         assignment[var] = value
 
-        for constraint in self.constraints:
-            if constraint.involves(var):
-                if not constraint.is_satisfied(assignment):
-                    assignment[var] = None
-                    return False
+        for constraint in self.var_constraints[var]:
+            self.stats.checks += 1
+            if not constraint.is_satisfied(assignment):
+                assignment[var] = None
+                self.conflict = (var, constraint)
+                return False
+
+        for i in self.var_globals[var]:
+            self.stats.checks += 1
+            if not self.global_constraints[i].is_satisfied(assignment):
+                assignment[var] = None
+                self.conflict = (var, self.global_constraints[i])
+                return False
 
         return True
 
-    # Removes a specified value from the specified variable's domain in variable_values
-    def remove_from_domain(self, var, value):
+    # Returns a mark of the current position of the trail, to undo back to later
+    def trail_mark(self):
+        return len(self.trail)
 
-        # Get the domain of the variable and remove the value
+    # Undoes all the domain changes recorded on the trail since the mark
+    def undo(self, mark):
+        while len(self.trail) > mark:
+            entry = self.trail.pop()
+            entry[0].restore(entry[1])
+            if self.var_heuristic is not None and entry[2] is not None:
+                self.var_heuristic.changed(entry[2])
+
+    # Records the state of a variable's domain on the trail before it is changed, and returns the domain
+    def save_domain(self, var):
         domain = self.variable_values[var]
-        domain = list(domain)
-        domain.remove(value)
+        self.trail.append((domain, domain.save(), var))
+        return domain
+
+    # Tells the variable selection state that a variable's domain changed
+    def domain_changed(self, var):
+        if self.var_heuristic is not None:
+            self.var_heuristic.changed(var)
 
-        # Set the domain of the variable to the newly updated domain
-        self.variable_values[var] = tuple(domain)
+    # Removes a specified value from the specified variable's domain in variable_values
+    def remove_from_domain(self, var, value):
+        # Record the change on the trail and remove the value in place
+        domain = self.save_domain(var)
+        domain.remove(value)
+        self.domain_changed(var)
+
+        self.stats.pruned += 1
+        if self.trace is not None:
+            self.trace("prune", var, value)
+
+    # Reduces the specified variable's domain to the single value it was assigned
+    def reduce_domain(self, var, value):
+        domain = self.save_domain(var)
+        domain.reduce_to(value)
+        self.domain_changed(var)
+
+    # Keeps only the values of a bitset domain that are set in the mask
+    def intersect_domain(self, var, mask):
+        domain = self.save_domain(var)
+        old_mask = domain.mask
+        domain.intersect(mask)
+        self.domain_changed(var)
+
+        self.stats.pruned += (old_mask & ~mask).bit_count()
+        if self.trace is not None:
+            self.trace("prune", var, None)
+
+    # Removes the values of a bitset domain that are set in the mask
+    def difference_domain(self, var, mask):
+        domain = self.save_domain(var)
+        old_mask = domain.mask
+        domain.difference(mask)
+        self.domain_changed(var)
+
+        self.stats.pruned += (old_mask & mask).bit_count()
+        if self.trace is not None:
+            self.trace("prune", var, None)
+
+    # Records that inference emptied the domain of a variable, because of the constraint
+    def wipeout(self, var, constraint):
+        self.stats.wipeouts += 1
+        self.conflict = (var, constraint)
+        if self.var_heuristic is not None:
+            self.var_heuristic.bump(constraint)
+        if self.trace is not None:
+            self.trace("wipeout", var, None)
 
     # Forward checker that removes values from neighboring variables as they are assigned
     def forward_check(self, var, value):
         # Dealing with self domain
-        self.variable_values[var] = (value,)
+        self.reduce_domain(var, value)
 
         # Dealing with neighbor domains
         neighbors = self.var_connections[var]
         if neighbors == None:
-            return True
+            neighbors = []
 
+        changed = [var]
         for neighbor in neighbors:
-            if neighbor in self.unassigned_variables and value in self.variable_values[neighbor]:
-                self.remove_from_domain(neighbor, value)
+            if neighbor in self.unassigned_variables:
+                constraint = self.find_constraint(var, neighbor)
+                if constraint is None:
+                    continue
+
+                # Remove every value of the neighbor that is not supported by the new value
+                size = len(self.variable_values[neighbor])
+                if self.bitset:
+                    self.stats.checks += 1
+                    mask = self.support_masks[(var, neighbor)][value]
+                    if self.variable_values[neighbor].mask & ~mask:
+                        self.intersect_domain(neighbor, mask)
+                else:
+                    supports = constraint.get_supports(var, value)
+                    self.stats.checks += size
+                    for neighbor_value in self.variable_values[neighbor]:
+                        if neighbor_value not in supports:
+                            self.remove_from_domain(neighbor, neighbor_value)
+
                 if len(self.variable_values[neighbor]) == 0:
+                    self.wipeout(neighbor, constraint)
                     return False
-
+                if len(self.variable_values[neighbor]) < size:
+                    changed.append(neighbor)
+
+        # Dealing with the global constraints on the changed variables
+        return self.propagate_globals(changed) is not None
+
+    # Runs the propagators of the global constraints involving any of the variables.
+    # Returns the list of variables whose domains they changed, or None if one of them failed
+    def propagate_globals(self, variables):
+        pruned = []
+        if len(self.global_constraints) == 0:
+            return pruned
+
+        done = set()
+        for var in variables:
+            for i in self.var_globals[var]:
+                if i in done:
+                    continue
+                done.add(i)
+
+                changed = self.global_constraints[i].propagate(self)
+                if changed is None:
+                    self.wipeout(var, self.global_constraints[i])
+                    return None
+                pruned.extend(changed)
+
+        return pruned
+
+    # Propagates all the global constraints before the search starts, so that problems they prove
+    # unsolvable are cut at the root. Returns False if one of them failed
+    def propagate_root(self):
+        for constraint in self.global_constraints:
+            if constraint.propagate(self) is None:
+                self.wipeout(constraint.variables[0], constraint)
+                return False
         return True
 
     # Chronological selecting of unassigned variables
     def chronological_select(self):
         if len(self.unassigned_variables) > 0:
             v = self.unassigned_variables.pop()
+            if self.var_heuristic is not None:
+                self.var_heuristic.assigned(v)
             return v
         return None
 
     # Minimum-remaining-values heuristic for selecting an unassigned variable
     def mrv_select(self):
-        unassigned = list(self.unassigned_variables)
-        min_var = unassigned[0]
-
-        for i in range(1, len(unassigned)):
-            if (len(self.variable_values[unassigned[i]]) < len(self.variable_values[min_var])):
-                min_var = unassigned[i]
+        min_var = min(self.unassigned_variables, key=lambda v: len(self.variable_values[v]))
 
         self.unassigned_variables.remove(min_var)
+        if self.var_heuristic is not None:
+            self.var_heuristic.assigned(min_var)
         return min_var
 
     # Calculates the number of constrains on neighbors that would result from assigning val to var
@@ -124,74 +471,122 @@ class ConstraintSatisfactionProblem:
 
     # Finds and returns the constraint involving the two variables
     def find_constraint(self, var1, var2):
-        for constraint in self.constraints:
-            if constraint.involves(var1) and constraint.involves(var2):
-                return constraint
-
-        return None
+        return self.constraint_index.get((var1, var2))
 
     # MAC inference
     def mac(self, var, value):
         # Dealing with self domain
-        self.variable_values[var] = (value,)
+        self.reduce_domain(var, value)
 
-        q = set()
+        # Arcs to revise, in the order they were added, each at most once at a time
+        q = deque()
+        queued = set()
         neighbors = self.var_connections[var]
 
         if neighbors is not None:
             for neighbor in neighbors:
                 if neighbor in self.unassigned_variables:
-                    q.add((neighbor, var))
-
-        while len(q) > 0:
-            pair = q.pop()
-            var1 = pair[0]
-            var2 = pair[1]
-            if self.revise(var1, var2):
-                # print("     Domains: " + str(self.variable_values) + "\n")
-                if len(self.variable_values[var1]) == 0:
-                    return False
-                next_neighbors = self.var_connections[var1]
+                    self.enqueue(q, queued, (neighbor, var))
+
+        # Alternate arc consistency with the global constraints on the revised variables, until neither changes anything
+        changed = [var]
+        while True:
+            while len(q) > 0:
+                pair = q.popleft()
+                queued.discard(pair)
+                var1 = pair[0]
+                var2 = pair[1]
+                if self.revise(var1, var2):
+                    if len(self.variable_values[var1]) == 0:
+                        self.wipeout(var1, self.find_constraint(var1, var2))
+                        return False
+                    changed.append(var1)
+                    next_neighbors = self.var_connections[var1]
+                    if next_neighbors is not None:
+                        for neighbor in next_neighbors:
+                            if neighbor != var and neighbor != var2:
+                                self.enqueue(q, queued, (neighbor, var1))
+
+            pruned = self.propagate_globals(changed)
+            if pruned is None:
+                return False
+            if len(pruned) == 0:
+                return True
+
+            changed = []
+            for pruned_var in pruned:
+                next_neighbors = self.var_connections[pruned_var]
                 if next_neighbors is not None:
                     for neighbor in next_neighbors:
                         if neighbor != var:
-                            q.add((neighbor, var1))
-
-        return True
-
+                            self.enqueue(q, queued, (neighbor, pruned_var))
 
+    # Adds an arc to the MAC queue unless it is already waiting in it
+    def enqueue(self, q, queued, arc):
+        if arc not in queued:
+            queued.add(arc)
+            q.append(arc)
 
     # Revise helper method to see if the domain of a pair has been revised
     def revise(self, var1, var2):
+        self.stats.revisions += 1
+        if self.trace is not None:
+            self.trace("revise", var1, var2)
+
+        if self.bitset:
+            return self.revise_bitset(var1, var2)
 
         revised = False
         domain1 = self.variable_values[var1]
         domain2 = self.variable_values[var2]
         constraint = self.find_constraint(var1, var2)
 
-        # print("variables: " + "(" + str(var1) + ", " + str(var2) + ")")
+        checks = 0
+        residues = self.residues
+
         for value1 in domain1:
-            satisfies_constraint = False
+            # Check the residual support found last time first. It is known to satisfy the constraint,
+            # so this is only a domain membership test, not a constraint check
+            residue = residues.get((var1, value1, var2))
+            if residue is not None and residue in domain2:
+                continue
+
+            # Look up the values of var2 that support value1 (the constraint handles the
+            # orientation of the variable pair), and find one that is still in var2's domain
+            supports = constraint.get_supports(var1, value1)
+            support = None
             for value2 in domain2:
-                value_pair = (value1, value2)
-                inverse = (value2, value1)
-                # print("value pair: " + str(value_pair))
-
-                # Since order matters in constraints, we must check if the variables
-                # are in the same order as the constriant variables
-                if (var1, var2) == constraint.variable_pair:
-                    if value_pair in constraint.values:
-                        satisfies_constraint = True
-                        break
-                else:
-                    if inverse in constraint.values:
-                        satisfies_constraint = True
-                        break
+                checks += 1
+                if value2 in supports:
+                    support = value2
+                    break
 
-            if not satisfies_constraint:
-                # print("revised domain of index: " + str(var1))
+            if support is None:
                 self.remove_from_domain(var1, value1)
-                # print("     Domains: " + str(self.variable_values) + "\n")
                 revised = True
+            else:
+                # The support works in both directions, so it is a residue for the reverse arc as well
+                residues[(var1, value1, var2)] = support
+                residues[(var2, support, var1)] = value1
+
+        self.stats.checks += checks
+        return revised
+
+    # Revise for bitset domains: a value of var1 is supported if its support mask intersects var2's domain.
+    # All the unsupported values are then removed with a single ANDNOT
+    def revise_bitset(self, var1, var2):
+        domain1 = self.variable_values[var1]
+        domain2_mask = self.variable_values[var2].mask
+        masks = self.support_masks[(var1, var2)]
+
+        removed = 0
+        for value1 in domain1:
+            if not masks[value1] & domain2_mask:
+                removed |= domain1.bit(value1)
+        self.stats.checks += len(domain1)
+
+        if removed:
+            self.difference_domain(var1, removed)
+            return True
 
-        return revised
\ No newline at end of file
+        return False
@@ -0,0 +1,82 @@
+import json
+import sqlite3
+import time
+
+class DiskCache:
+
+    # Constructor
+    # A persistent key-value store in an SQLite database file, bounded in size: when the values stored take more
+    # than max_bytes, the least recently used ones are evicted. Several processes can share the same file.
+    # Reads don't write: the times the keys were used are kept in memory, and written in one transaction on the
+    # next put, on close, or once flush_limit of them have piled up
+    # @path the database file, created if it doesn't exist
+    # @max_bytes the size bound, as the total length of the stored values (JSON-encoded)
+    # @flush_limit the most use times kept in memory before they are written
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, flush_limit=256):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.flush_limit = flush_limit
+        self.evictions = 0
+        self.used = {}
+
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS entries "
+                                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                                "used REAL NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+        self.connection.commit()
+
+    # Returns the value stored for the key (marking it as used), or None if there is none
+    def get(self, key):
+        row = self.connection.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        self.used[key] = time.time()
+        if len(self.used) >= self.flush_limit:
+            self.flush()
+        return json.loads(row[0])
+
+    # Writes the use times kept in memory
+    def flush(self):
+        if len(self.used) == 0:
+            return
+        self.connection.executemany("UPDATE entries SET used = ? WHERE key = ?",
+                                    [(used, key) for key, used in self.used.items()])
+        self.connection.commit()
+        self.used = {}
+
+    # Stores a value (anything JSON can encode) for the key, then evicts the least recently used values
+    # until the cache is within its size bound
+    def put(self, key, value):
+        data = json.dumps(value, separators=(",", ":"))
+        self.used.pop(key, None)
+        self.connection.executemany("UPDATE entries SET used = ? WHERE key = ?",
+                                    [(used, other) for other, used in self.used.items()])
+        self.used = {}
+        self.connection.execute("INSERT OR REPLACE INTO entries (key, value, size, used) VALUES (?, ?, ?, ?)",
+                                (key, data, len(data), time.time()))
+        self.evict()
+        self.connection.commit()
+
+    # Evicts the least recently used values while the total size is over the bound
+    def evict(self):
+        total = self.size()
+        while total > self.max_bytes:
+            row = self.connection.execute("SELECT key, size FROM entries ORDER BY used LIMIT 1").fetchone()
+            if row is None:
+                return
+            self.connection.execute("DELETE FROM entries WHERE key = ?", (row[0],))
+            total -= row[1]
+            self.evictions += 1
+
+    # Returns the total size of the stored values
+    def size(self):
+        return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        self.flush()
+        self.connection.close()
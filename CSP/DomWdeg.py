@@ -0,0 +1,112 @@
+import heapq
+
+class DomWdeg:
+
+    # Constructor
+    # Variable selection state for the dom/wdeg heuristic: every constraint has a weight, starting at 1, that goes up
+    # each time it causes a domain wipeout, and the variable with the smallest ratio of domain size to weighted
+    # degree (the total weight of its constraints on other unassigned variables) is selected next.
+    # The unassigned variables are kept in a heap of (ratio, variable) entries. An entry is pushed every time
+    # a variable's ratio changes, and entries whose ratio is out of date are dropped when they reach the top
+    # @csp the ConstraintSatisfactionProblem the heuristic is attached to
+    # @weighted whether to use the weighted degree (dom/wdeg), or only the domain size (MRV)
+    # @weights optional constraint weights learned by an earlier search, to start from
+    def __init__(self, csp, weighted=True, weights=None):
+        self.csp = csp
+        self.weighted = weighted
+        self.weights = weights
+        if self.weights is None:
+            self.weights = {}
+        self.wdeg = []
+        self.heap = []
+
+        for var in range(csp.num_var):
+            self.wdeg.append(0)
+            for constraint in csp.var_constraints[var]:
+                if self.other(constraint, var) in csp.unassigned_variables:
+                    self.wdeg[var] += self.weight(constraint)
+            for i in csp.var_globals[var]:
+                self.wdeg[var] += self.weight(csp.global_constraints[i])
+
+        self.rebuild()
+
+    # Returns the weight of a constraint
+    def weight(self, constraint):
+        return self.weights.get(constraint, 1)
+
+    # Returns the other variable of a binary constraint
+    def other(self, constraint, var):
+        if constraint.variable_pair[0] == var:
+            return constraint.variable_pair[1]
+        return constraint.variable_pair[0]
+
+    # Returns the heuristic value of a variable: smaller is selected first
+    def ratio(self, var):
+        size = len(self.csp.variable_values[var])
+        if not self.weighted:
+            return size
+        if self.wdeg[var] == 0:
+            return float("inf")
+        return size / float(self.wdeg[var])
+
+    # Rebuilds the heap from the unassigned variables, dropping all the out-of-date entries
+    def rebuild(self):
+        self.heap = [(self.ratio(var), var) for var in self.csp.unassigned_variables]
+        heapq.heapify(self.heap)
+
+    # Pushes the current ratio of a variable whose domain or weighted degree changed
+    def changed(self, var):
+        if var in self.csp.unassigned_variables:
+            heapq.heappush(self.heap, (self.ratio(var), var))
+            if len(self.heap) > 4 * self.csp.num_var + 64:
+                self.rebuild()
+
+    # Removes and returns the unassigned variable with the smallest ratio, or None if all are assigned
+    def select(self):
+        unassigned = self.csp.unassigned_variables
+        if len(unassigned) == 0:
+            return None
+
+        while True:
+            if len(self.heap) == 0:
+                self.rebuild()
+
+            entry = heapq.heappop(self.heap)
+            var = entry[1]
+            if var in unassigned and entry[0] == self.ratio(var):
+                unassigned.remove(var)
+                self.assigned(var)
+                return var
+
+    # The variable was assigned: its constraints no longer count towards its neighbors' weighted degrees
+    def assigned(self, var):
+        for constraint in self.csp.var_constraints[var]:
+            neighbor = self.other(constraint, var)
+            self.wdeg[neighbor] -= self.weight(constraint)
+            self.changed(neighbor)
+
+    # The variable is unassigned again: its constraints count towards its neighbors' weighted degrees again
+    def unassigned(self, var):
+        for constraint in self.csp.var_constraints[var]:
+            neighbor = self.other(constraint, var)
+            self.wdeg[neighbor] += self.weight(constraint)
+            self.changed(neighbor)
+        self.changed(var)
+
+    # The constraint caused a domain wipeout: increase its weight
+    def bump(self, constraint):
+        self.weights[constraint] = self.weight(constraint) + 1
+
+        if hasattr(constraint, "variable_pair"):
+            var1 = constraint.variable_pair[0]
+            var2 = constraint.variable_pair[1]
+            if var2 in self.csp.unassigned_variables:
+                self.wdeg[var1] += 1
+                self.changed(var1)
+            if var1 in self.csp.unassigned_variables:
+                self.wdeg[var2] += 1
+                self.changed(var2)
+        else:
+            for var in constraint.variables:
+                self.wdeg[var] += 1
+                self.changed(var)
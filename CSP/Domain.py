@@ -0,0 +1,54 @@
+class Domain:
+
+    # Constructor
+    # A reversible domain stored as a sparse set: the first 'size' entries of self.values are the
+    # values currently in the domain, and self.positions maps each value to its index in self.values.
+    # Removing a value swaps it past the end of the live section, so undoing removals only needs the old size.
+    # @values the initial values of the domain
+    def __init__(self, values):
+        self.values = list(values)
+        self.positions = {}
+        for i in range(0, len(self.values)):
+            self.positions[self.values[i]] = i
+        self.size = len(self.values)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, value):
+        pos = self.positions.get(value)
+        return pos is not None and pos < self.size
+
+    # Iterates over a snapshot of the live values, so values can be removed while iterating
+    def __iter__(self):
+        return iter(self.values[:self.size])
+
+    # Swaps the values at the two positions
+    def swap(self, pos1, pos2):
+        value1 = self.values[pos1]
+        value2 = self.values[pos2]
+        self.values[pos1] = value2
+        self.values[pos2] = value1
+        self.positions[value2] = pos1
+        self.positions[value1] = pos2
+
+    # Removes a value in place by moving it past the end of the live section
+    def remove(self, value):
+        self.swap(self.positions[value], self.size - 1)
+        self.size -= 1
+
+    # Reduces the domain to the single specified value
+    def reduce_to(self, value):
+        self.swap(self.positions[value], 0)
+        self.size = 1
+
+    # Returns the state needed to undo later changes to the domain
+    def save(self):
+        return self.size
+
+    # Restores the domain to a previously saved state
+    def restore(self, state):
+        self.size = state
+
+    def __repr__(self):
+        return str(tuple(self.values[:self.size]))
@@ -0,0 +1,122 @@
+from Constraint import Constraint
+
+class IntensionalConstraint(Constraint):
+
+    # Constructor
+    # A constraint defined by a relation instead of a list of allowable value pairs. Subclasses implement
+    # check(value1, value2), with the values in the order of the variable pair
+    # @var_pair the pair of integers corresponding to the variables involved in the constraint
+    def __init__(self, var_pair):
+        self.variable_pair = var_pair
+        self.inverse = (self.variable_pair[1], self.variable_pair[0])
+
+    # Checks to see if a value of the first variable and a value of the second variable are allowed together
+    def check(self, value1, value2):
+        raise NotImplementedError
+
+    # Returns the values of the other variable that are allowed when var takes value, as a container
+    # that tests each value with the relation when it is looked up
+    def get_supports(self, var, value):
+        return Supports(self, var == self.variable_pair[0], value)
+
+    # Checks to see if a value for var1 and a value for var2 are allowed together
+    def allows(self, var1, value1, value2):
+        if var1 == self.variable_pair[0]:
+            return self.check(value1, value2)
+        return self.check(value2, value1)
+
+    # Checks to see if the assignment satisfies the constraint
+    def is_satisfied(self, assignment):
+        value1 = assignment[self.variable_pair[0]]
+        value2 = assignment[self.variable_pair[1]]
+
+        if value1 is None or value2 is None:
+            return True
+
+        return self.check(value1, value2)
+
+    def __str__(self):
+        return "{" + str(self.variable_pair) + ": " + type(self).__name__ + "}"
+
+class Supports:
+
+    # Constructor
+    # @constraint the constraint whose relation is tested
+    # @forward whether the fixed value belongs to the first variable of the constraint
+    # @value the fixed value
+    def __init__(self, constraint, forward, value):
+        self.constraint = constraint
+        self.forward = forward
+        self.value = value
+
+    def __contains__(self, other):
+        if self.forward:
+            return self.constraint.check(self.value, other)
+        return self.constraint.check(other, self.value)
+
+class NotEqualConstraint(IntensionalConstraint):
+
+    # The two variables must take different values (e.g. neighboring countries get different colors)
+    def check(self, value1, value2):
+        return value1 != value2
+
+class NoOverlapConstraint(IntensionalConstraint):
+
+    # Constructor
+    # The two pieces, placed at their bottom-left corner positions, must not overlap on the board
+    # @piece1 the BoardPiece of the first variable
+    # @piece2 the BoardPiece of the second variable
+    # @board_n the width of the board, used to convert positions to coordinates
+    def __init__(self, var_pair, piece1, piece2, board_n):
+        IntensionalConstraint.__init__(self, var_pair)
+        self.piece1 = piece1
+        self.piece2 = piece2
+        self.board_n = board_n
+
+    # Two rectangles don't overlap if one is entirely to the side of, above or below the other
+    def check(self, pos1, pos2):
+        x1 = pos1 % self.board_n
+        y1 = pos1 // self.board_n
+        x2 = pos2 % self.board_n
+        y2 = pos2 // self.board_n
+
+        return (x1 + self.piece1.getN() <= x2 or x2 + self.piece2.getN() <= x1 or
+                y1 + self.piece1.getM() <= y2 or y2 + self.piece2.getM() <= y1)
+
+class OrderedNoOverlapConstraint(NoOverlapConstraint):
+
+    # Two identical pieces must not overlap, and the first one is placed at a higher position than the second,
+    # so that the pieces cannot swap places
+    def check(self, pos1, pos2):
+        return pos1 > pos2 and NoOverlapConstraint.check(self, pos1, pos2)
+
+class LessThanConstraint(IntensionalConstraint):
+
+    # The first variable must take a smaller value than the second (e.g. to order interchangeable pieces)
+    def check(self, value1, value2):
+        return value1 < value2
+
+class PredicateConstraint(IntensionalConstraint):
+
+    # Constructor
+    # @predicate function(value1, value2) that returns whether the values are allowed together
+    # @supports optional function(value1) returning the set of values of the second variable allowed with value1
+    # @inverse_supports optional function(value2) returning the set of values of the first variable allowed with value2
+    def __init__(self, var_pair, predicate, supports=None, inverse_supports=None):
+        IntensionalConstraint.__init__(self, var_pair)
+        self.predicate = predicate
+        self.supports = supports
+        self.inverse_supports = inverse_supports
+
+    def check(self, value1, value2):
+        return self.predicate(value1, value2)
+
+    # Uses the fast support functions when they are given
+    def get_supports(self, var, value):
+        if var == self.variable_pair[0]:
+            if self.supports is not None:
+                return self.supports(value)
+        elif self.inverse_supports is not None:
+            return self.inverse_supports(value)
+
+        return IntensionalConstraint.get_supports(self, var, value)
@@ -1,15 +1,33 @@
 # author: Angela Li
 # date: 10/17/17
 
+import time
+
+from AllDifferentConstraint import AllDifferentConstraint, find_cliques
 from Constraint import Constraint
+from IntensionalConstraint import NotEqualConstraint
+from ValuePrecedenceConstraint import ValuePrecedenceConstraint
 from ConstraintSatisfactionProblem import ConstraintSatisfactionProblem
-from backtracking_search import backtracking_search
+from backtracking_search import repair, solve
+from model_file import file_digest, load_model, model_symmetry
 
 class MapColoringCSP:
 
     # Constructor
-    def __init__(self, map_filename):
+    # @bitset whether the underlying CSP stores its domains as bitmasks
+    # @extensional whether to build each constraint's list of allowable color pairs instead of a not-equal relation
+    # @all_different whether to add an all-different constraint on each clique of mutually bordering countries
+    # @symmetry whether to break the symmetry of the colors, which are all interchangeable, so that only one of
+    #   the solutions that only differ by a renaming of the colors is found
+    # @build whether to build the constraints and the CSP (self.int_csp), or only read the map, e.g. to look its
+    #   solution up in a cache (see 'caching.py') or to print a solution
+    # @model optional model file compiled from this map (see 'model_file.py'), which is loaded instead of building
+    #   the constraints. It holds the constraints it was compiled with, so only the bitset option applies
+    def __init__(self, map_filename, bitset=False, extensional=False, all_different=True, symmetry=False,
+                 build=True, model=None):
+        start = time.perf_counter()
         self.variables = []
+        self.variable_indices = {}
         self.domain = None
         self.int_domains = []
         self.constraint_pairs = []
@@ -24,6 +42,8 @@ class MapColoringCSP:
 
             if line_num == 0:
                 self.variables = components
+                for i in range(len(self.variables)):
+                    self.variable_indices[self.variables[i]] = i
 
             if line_num == 1:
                 self.generate_domains(tuple(components))
@@ -36,10 +56,123 @@ class MapColoringCSP:
 
         f.close()
 
-        self.legal_constraint_values = self.legal_values(self.int_domains[0])
+        self.symmetry = symmetry
+
+        # The CSP (only built with build=True), and the last solution found, which repair() starts from after
+        # the map is changed
+        self.int_csp = None
+        self.last_solution = None
+        if not build:
+            return
+
+        self.extensional = extensional
+        self.legal_constraint_values = None
+        if self.extensional:
+            self.legal_constraint_values = self.legal_values(self.int_domains[0])
+
+        if model is not None:
+            self.int_csp = load_model(model, bitset, file_digest(map_filename))
+            self.connections = self.int_csp.var_connections
+            self.constraints = self.int_csp.constraints
+            self.global_constraints = self.int_csp.global_constraints
+            self.symmetry = model_symmetry(model)
+            self.int_csp.stats.build_time = time.perf_counter() - start
+            return
+
         self.generate_constraints()
 
-        self.int_csp = ConstraintSatisfactionProblem(len(self.variables), self.connections, self.int_domains, self.constraints)
+        self.global_constraints = []
+        if all_different:
+            self.generate_all_different()
+        if symmetry:
+            self.global_constraints.append(ValuePrecedenceConstraint(range(len(self.variables)), self.int_domains[0]))
+
+        self.int_csp = ConstraintSatisfactionProblem(len(self.variables), self.connections, self.int_domains,
+                                                     self.constraints, bitset, self.global_constraints)
+        self.int_csp.stats.build_time = time.perf_counter() - start
+
+    # Changing the map. The regions, borders and colors of the model can be changed after it is built, and
+    # repair() then re-solves it from the last solution (see 'repair' in 'backtracking_search.py').
+    # Removed regions keep their index in the solutions, with the value None. New borders don't add
+    # all-different constraints on the cliques they close, which only add propagation to the binary constraints
+
+    # Adds a region bordering the given regions, and returns its index
+    def add_region(self, name, borders=()):
+        if name in self.variable_indices:
+            raise ValueError("There is already a region named " + name)
+
+        var = self.int_csp.add_variable(self.int_domains[0])
+        self.variables.append(name)
+        self.variable_indices[name] = var
+        self.int_domains.append(self.int_domains[0])
+
+        # With the color symmetry broken, the new region comes last in the precedence order
+        if self.symmetry:
+            for constraint in self.global_constraints:
+                if isinstance(constraint, ValuePrecedenceConstraint):
+                    constraint.add_variable(var)
+            self.int_csp.index_global_constraints()
+
+        for neighbor in borders:
+            self.add_border(name, neighbor)
+        return var
+
+    # Removes a region, along with its borders
+    def remove_region(self, name):
+        var = self.region_index(name)
+        self.constraint_pairs = [pair for pair in self.constraint_pairs if var not in pair]
+        self.int_csp.remove_variable(var)
+        del self.variable_indices[name]
+
+    # Adds a border between two regions. Extensional constraints share the table of allowable color pairs
+    def add_border(self, name1, name2):
+        pair = (self.region_index(name1), self.region_index(name2))
+        if self.extensional:
+            constraint = Constraint(pair, self.legal_constraint_values)
+        else:
+            constraint = NotEqualConstraint(pair)
+
+        self.int_csp.add_constraint(constraint)
+        self.constraint_pairs.append(pair)
+
+    # Removes the border between two regions, and the all-different constraints on the cliques it was part of
+    def remove_border(self, name1, name2):
+        var1 = self.region_index(name1)
+        var2 = self.region_index(name2)
+        constraint = self.int_csp.find_constraint(var1, var2)
+        if constraint is None:
+            raise ValueError(name1 + " and " + name2 + " don't border each other")
+
+        self.int_csp.remove_constraint(constraint)
+        self.constraint_pairs.remove(constraint.variable_pair)
+        for global_constraint in list(self.global_constraints):
+            if isinstance(global_constraint, AllDifferentConstraint) and global_constraint.involves(var1) and \
+                    global_constraint.involves(var2):
+                self.int_csp.remove_global_constraint(global_constraint)
+
+    # Fixes the color of a region
+    def pin_region(self, name, color):
+        if self.symmetry:
+            raise ValueError("Regions cannot be pinned when the color symmetry is broken")
+        self.int_csp.set_domain(self.region_index(name), (self.domain.index(color),))
+
+    # Lets a pinned region take any color again
+    def unpin_region(self, name):
+        var = self.region_index(name)
+        self.int_csp.set_domain(var, self.int_domains[var])
+
+    # Returns the index of a region, or fails if there is no such region
+    def region_index(self, name):
+        if name not in self.variable_indices:
+            raise ValueError("There is no region named " + name)
+        return self.variable_indices[name]
+
+    # Re-solves the map after it was changed, starting from the last solution, and returns the new solution.
+    # The search configuration is passed on to repair() in 'backtracking_search.py'
+    def repair(self, select="dom_wdeg", order="random", inference="fc", seed=None, backjump=False):
+        self.last_solution = repair(self.int_csp, self.last_solution or [], select, order, inference, seed,
+                                    backjump)
+        return self.last_solution
 
     # Generates the legal values based on the domain
     def legal_values(self, domain):
@@ -55,8 +188,8 @@ class MapColoringCSP:
     def generate_pairs_connections(self, components):
         for component in components:
             variables = component.split("-")
-            var1_index = self.variables.index(variables[0])
-            var2_index = self.variables.index(variables[1])
+            var1_index = self.variable_indices[variables[0]]
+            var2_index = self.variable_indices[variables[1]]
 
             # Creating and adding the binary pair
             var_pair = (var1_index, var2_index)
@@ -67,10 +200,31 @@ class MapColoringCSP:
             self.connections[var2_index].append(var1_index)
 
 
-    # Generates the constraint objects from the constraint pairs and legal values
+    # Generates the constraint objects from the constraint pairs (and legal values, if extensional)
     def generate_constraints(self):
         for pair in self.constraint_pairs:
-            self.constraints.append(Constraint(pair, self.legal_constraint_values))
+            if self.extensional:
+                self.constraints.append(Constraint(pair, self.legal_constraint_values))
+            else:
+                self.constraints.append(NotEqualConstraint(pair))
+
+    # Generates an all-different constraint for each clique of at least 3 mutually bordering countries.
+    # The binary constraints stay, the all-different constraints add matching-based propagation on top of them
+    def generate_all_different(self):
+        for clique in find_cliques(self.connections):
+            self.global_constraints.append(AllDifferentConstraint(clique, True))
+
+    # Returns the number of solutions that a solution stands for: with the symmetry broken, every solution is found
+    # once for all the ways of renaming the colors it uses with different colors
+    def orbit_size(self, solution):
+        if not self.symmetry:
+            return 1
+
+        size = 1
+        num_colors = len(self.domain)
+        for i in range(len(set(solution))):
+            size *= num_colors - i
+        return size
 
     # Initializes the connections hashtable
     def init_connections(self):
@@ -90,11 +244,23 @@ class MapColoringCSP:
         self.domain = domain
 
     # Prints the solution to the backtracking search in word form. (e.g. Country name: color)
-    def solution(self):
-        result = backtracking_search(self.int_csp)
+    # The search configuration is passed on to solve() in 'backtracking_search.py'
+    def solution(self, select="chronological", order="random", inference="none", seed=None, restarts=None,
+                 backjump=False):
+        self.last_solution = solve(self.int_csp, select, order, inference, seed, restarts, backjump)
+        self.print_solution(self.last_solution)
+
+    # Prints a solution (a list of color indices), or None, in word form
+    def print_solution(self, result):
+        if result is None:
+            print("No solution")
+            return
+
         sol = ""
 
         for i in range(0, len(result)):
+            if result[i] is None:
+                continue
             sol += self.variables[i] + ": " + self.domain[result[i]] + "\n"
 
         print(sol)
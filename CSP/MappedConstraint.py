@@ -0,0 +1,93 @@
+class MappedConstraint:
+
+    # Constructor
+    # A binary constraint whose support tables live in a compiled model file (see 'model_file.py') that is
+    # memory-mapped, so loading it costs nothing per value pair, and processes that load the same file share its
+    # pages. Each table has a row for each value of one variable: a bitmask over the domain of the other variable,
+    # in the order the domains were compiled in
+    # @var_pair the pair of integers corresponding to the variables involved in the constraint
+    # @forward the MappedMasks of the first variable's values, over the second variable's domain
+    # @backward the MappedMasks of the second variable's values, over the first variable's domain
+    def __init__(self, var_pair, forward, backward):
+        self.variable_pair = var_pair
+        self.inverse = (self.variable_pair[1], self.variable_pair[0])
+        self.forward = forward
+        self.backward = backward
+
+    # Returns the values of the other variable that are allowed when var takes value, as a container
+    # that tests each value against the row of the table
+    def get_supports(self, var, value):
+        if var == self.variable_pair[0]:
+            return MaskSupports(self.forward[value], self.backward.positions)
+        return MaskSupports(self.backward[value], self.forward.positions)
+
+    # Returns the support masks of var's values, if the domains are still the ones the model was compiled with
+    # (the masks can then be used for bitset domains as they are), or None
+    def support_masks(self, var, values, neighbor_values):
+        masks = self.forward
+        neighbor_masks = self.backward
+        if var != self.variable_pair[0]:
+            masks = self.backward
+            neighbor_masks = self.forward
+
+        if values != masks.values or neighbor_values != neighbor_masks.values:
+            return None
+        return masks
+
+    # Checks to see if a value for var1 and a value for var2 are allowed together
+    def allows(self, var1, value1, value2):
+        return value2 in self.get_supports(var1, value1)
+
+    # Checks to see if the assignment satisfies the constraint
+    def is_satisfied(self, assignment):
+        value1 = assignment[self.variable_pair[0]]
+        value2 = assignment[self.variable_pair[1]]
+
+        if value1 is None or value2 is None:
+            return True
+
+        return value2 in self.get_supports(self.variable_pair[0], value1)
+
+    # Checks to see if a specific variable is involved in the constraint
+    def involves(self, var):
+        return var in self.variable_pair
+
+    def __str__(self):
+        return "{" + str(self.variable_pair) + ": MappedConstraint}"
+
+class MappedMasks:
+
+    # Constructor
+    # A table of bitmasks in a memory-mapped buffer, one fixed-size row for each value of a variable, which reads
+    # like a dictionary from the values to their masks (as integers)
+    # @buffer the memory-mapped file
+    # @offset the position of the first row in the buffer
+    # @row_bytes the size of a row
+    # @values the variable's values, in the order of the rows
+    # @positions the row of each value
+    def __init__(self, buffer, offset, row_bytes, values, positions):
+        self.buffer = buffer
+        self.offset = offset
+        self.row_bytes = row_bytes
+        self.values = values
+        self.positions = positions
+
+    def __getitem__(self, value):
+        start = self.offset + self.positions[value] * self.row_bytes
+        return int.from_bytes(self.buffer[start:start + self.row_bytes], "little")
+
+    def __len__(self):
+        return len(self.values)
+
+class MaskSupports:
+
+    # Constructor
+    # @mask the bitmask of the allowed values of the other variable
+    # @positions the bit of each value of the other variable
+    def __init__(self, mask, positions):
+        self.mask = mask
+        self.positions = positions
+
+    def __contains__(self, value):
+        pos = self.positions.get(value)
+        return pos is not None and (self.mask >> pos) & 1 == 1
@@ -0,0 +1,168 @@
+class NogoodStore:
+
+    # Constructor
+    # A store of nogoods: combinations of assignments (var, value) that are known to have no solution.
+    # They are learned from the branches a restarted search had refuted, and enforced in the later runs.
+    # Each nogood is watched by two of its assignments (its first two), which are kept not made: an assignment
+    # only visits the nogoods watching it, and moves the watch to another assignment not made if there is one.
+    # A nogood is only checked when one of its watched assignments is made, so the cost of an assignment doesn't
+    # grow with the number of nogoods, and backtracking leaves the watches as they are
+    # @max_nogoods the most nogoods kept: past it, the oldest ones are forgotten
+    # @max_length the most assignments in a nogood: longer ones prune too little to be worth checking
+    # @self.nogoods the list of nogoods, each a list of (var, value) pairs
+    # @self.watches the nogoods watched by each (var, value) pair
+    # @self.seen the set of assignments of each nogood, so the same nogood is never added twice
+    # @self.reasons the variables of the nogood that removed each value of each variable (var -> value -> list),
+    #   so the search can blame them for the removal (see blame)
+    # @self.variables the variables of the nogood that failed last, which stands for the failed constraint in
+    #   csp.conflict
+    def __init__(self, max_nogoods=10000, max_length=20):
+        self.max_nogoods = max_nogoods
+        self.max_length = max_length
+        self.nogoods = []
+        self.watches = {}
+        self.seen = set()
+        self.reasons = {}
+        self.variables = []
+
+    def __len__(self):
+        return len(self.nogoods)
+
+    # Adds a nogood, watched by its first two assignments, unless it is already in the store or too long
+    def add(self, literals):
+        key = frozenset(literals)
+        if len(literals) > self.max_length or key in self.seen:
+            return
+        self.seen.add(key)
+
+        index = len(self.nogoods)
+        self.nogoods.append(literals)
+        for literal in literals[:2]:
+            self.watches.setdefault(literal, []).append(index)
+
+    # Forgets the oldest nogoods, keeping the newest max_nogoods, and watches the ones kept again.
+    # Only called when a run is cut off, so none of the assignments are made by the time the nogoods are checked again
+    def forget(self):
+        kept = self.nogoods[len(self.nogoods) - self.max_nogoods:]
+        self.nogoods = []
+        self.watches = {}
+        self.seen = set()
+        for literals in kept:
+            self.add(literals)
+
+    # Records the nogoods of a search that is being cut off. Each frame of the search stack holds
+    # [variable, ordered values, index of the next value, trail mark]: the values before the one being explored
+    # were refuted under the values being explored by the frames below it (for the top frame, every value
+    # before the next one was refuted). Only the decisions of the variables the search blamed for the refutation
+    # of a value (see conflict_culprits in 'backtracking_search.py') are to blame for it, so each refuted value gives
+    # the nogood: those decisions, plus that value. Values that one of those decisions rules out through a
+    # constraint are skipped, since the constraint already says as much
+    # @refutations the variables blamed for each refuted value ((var, value) -> set)
+    def record(self, csp, stack, refutations):
+        decisions = []
+        for i in range(len(stack)):
+            var = stack[i][0]
+            values = stack[i][1]
+            index = stack[i][2]
+
+            refuted = index
+            if i < len(stack) - 1:
+                refuted = index - 1
+
+            for value in values[:refuted]:
+                blamed = refutations[(var, value)]
+                culprits = [decision for decision in decisions if decision[0] in blamed]
+                if not implied(csp, culprits, var, value):
+                    self.add(culprits + [(var, value)])
+
+            if i < len(stack) - 1:
+                decisions.append((var, values[index - 1]))
+
+        # The removals made by the nogoods are all undone with the run
+        self.reasons = {}
+        if len(self.nogoods) > self.max_nogoods:
+            self.forget()
+
+    # Visits the nogoods watching the new assignment var = value. The watch moves to another assignment of the
+    # nogood that is not made, if there is one. Otherwise, the nogood fails if its other watched assignment is made
+    # too, and if that variable is unassigned, its value is removed from the variable's domain.
+    # Returns False if the assignment completes a nogood or the removals wiped out a domain, with csp.conflict
+    # set to (the variable that failed, this store) and self.variables to the variables of the nogood
+    def check(self, csp, assignment, var, value):
+        literal = (var, value)
+        watching = self.watches.get(literal)
+        if watching is None:
+            return True
+
+        kept = []
+        for k in range(len(watching)):
+            index = watching[k]
+            nogood = self.nogoods[index]
+            if len(nogood) == 1:
+                kept.append(index)
+                self.watches[literal] = kept + watching[k + 1:]
+                self.fail(csp, var, nogood)
+                return False
+
+            # The assignment just made is put second, so the first is the other watched one
+            if nogood[0] == literal:
+                nogood[0] = nogood[1]
+                nogood[1] = literal
+            other = nogood[0]
+
+            # The nogood can't be completed while the other watched variable has another value
+            if assignment[other[0]] is not None and assignment[other[0]] != other[1]:
+                kept.append(index)
+                continue
+
+            moved = False
+            for i in range(2, len(nogood)):
+                if assignment[nogood[i][0]] != nogood[i][1]:
+                    nogood[1] = nogood[i]
+                    nogood[i] = literal
+                    self.watches.setdefault(nogood[1], []).append(index)
+                    moved = True
+                    break
+            if moved:
+                continue
+
+            kept.append(index)
+            if assignment[other[0]] == other[1]:
+                self.watches[literal] = kept + watching[k + 1:]
+                self.fail(csp, var, nogood)
+                return False
+
+            if other[1] in csp.variable_values[other[0]]:
+                csp.remove_from_domain(other[0], other[1])
+                self.reasons.setdefault(other[0], {})[other[1]] = [literal[0] for literal in nogood[1:]]
+                if len(csp.variable_values[other[0]]) == 0:
+                    self.watches[literal] = kept + watching[k + 1:]
+                    self.fail(csp, other[0], nogood)
+                    return False
+
+        self.watches[literal] = kept
+        return True
+
+    # Records the failure of a nogood on var in csp.conflict
+    def fail(self, csp, var, nogood):
+        self.variables = [literal[0] for literal in nogood]
+        csp.conflict = (var, self)
+
+    # Returns the variables of the nogoods that removed the values missing from the variable's domain.
+    # A value put back by backtracking and removed again by something else keeps its old reason, so this can blame
+    # more variables than needed, but never fewer
+    def blame(self, csp, var):
+        blamed = set()
+        domain = csp.variable_values[var]
+        for value, variables in self.reasons.get(var, {}).items():
+            if value not in domain:
+                blamed.update(variables)
+        return blamed
+
+# Checks whether one of the decisions rules out var = value through the constraint between them
+def implied(csp, decisions, var, value):
+    for decision in decisions:
+        constraint = csp.constraint_index.get((var, decision[0]))
+        if constraint is not None and not constraint.allows(var, value, decision[1]):
+            return True
+    return False
@@ -0,0 +1,118 @@
+class PackingConstraint:
+
+    # Constructor
+    # A global constraint that pieces placed on a board don't overlap. Each placement of a piece is
+    # precomputed as a mask of the board cells it occupies, so checking whether a placement fits is a single
+    # AND with the mask of the occupied cells, which is kept up to date (and undone on backtrack) as pieces are placed
+    # @variables the list of integers corresponding to the pieces
+    # @placements for each variable, a dictionary from each of its values to the occupancy mask of that placement
+    # @areas for each variable, the number of cells its piece covers
+    # @num_cells the number of cells on the board
+    def __init__(self, variables, placements, areas, num_cells):
+        self.variables = list(variables)
+        self.placements = placements
+        self.areas = areas
+        self.num_cells = num_cells
+
+        # Running state: the occupied cells, the placed variables (as a bitmask) and their total area
+        self.occupied = 0
+        self.placed = 0
+        self.placed_area = 0
+        self.total_area = sum(areas[var] for var in self.variables)
+
+    # Checks to see if a specific variable is involved in the constraint
+    def involves(self, var):
+        return var in self.variables
+
+    # Adds a piece, or replaces the placements and area of one that is already in the constraint
+    # @placements a dictionary from each of the piece's values to the occupancy mask of that placement
+    def set_piece(self, var, placements, area):
+        while len(self.placements) <= var:
+            self.placements.append({})
+            self.areas.append(0)
+        if var in self.variables:
+            self.total_area -= self.areas[var]
+        else:
+            self.variables.append(var)
+        self.placements[var] = placements
+        self.areas[var] = area
+        self.total_area += area
+
+    # Takes a piece out of the constraint
+    def remove_variable(self, var):
+        self.variables.remove(var)
+        self.total_area -= self.areas[var]
+
+    # Checks to see if the placed pieces of the assignment don't overlap
+    def is_satisfied(self, assignment):
+        occupied = 0
+        for var in self.variables:
+            value = assignment[var]
+            if value is not None:
+                mask = self.placements[var][value]
+                if occupied & mask:
+                    return False
+                occupied |= mask
+        return True
+
+    # Returns the state needed to undo later changes to the running state
+    def save(self):
+        return (self.occupied, self.placed, self.placed_area)
+
+    # Restores the running state to a previously saved state
+    def restore(self, state):
+        self.occupied = state[0]
+        self.placed = state[1]
+        self.placed_area = state[2]
+
+    # Places the pieces whose domains are down to one placement, then removes the placements of the other
+    # pieces that overlap the occupied cells, until no more pieces are forced. Fails early if the free cells
+    # can't hold the area of the pieces left. Returns the list of variables whose domains changed,
+    # or None if the pieces can't all be placed
+    def propagate(self, csp):
+        csp.trail.append((self, self.save(), None))
+        changed = []
+
+        while True:
+            # Add the newly placed pieces to the occupied cells
+            newly_placed = False
+            for var in self.variables:
+                if (self.placed >> var) & 1 == 0 and len(csp.variable_values[var]) == 1:
+                    for value in csp.variable_values[var]:
+                        mask = self.placements[var][value]
+                    if self.occupied & mask:
+                        return None
+                    self.occupied |= mask
+                    self.placed |= 1 << var
+                    self.placed_area += self.areas[var]
+                    newly_placed = True
+
+            if not newly_placed:
+                return changed
+
+            # Area pruning: the pieces left must fit in the free cells
+            free_cells = self.num_cells - self.occupied.bit_count()
+            if self.total_area - self.placed_area > free_cells:
+                return None
+
+            # Remove the placements of the other pieces that overlap the occupied cells
+            occupied = self.occupied
+            for var in self.variables:
+                if (self.placed >> var) & 1 == 1:
+                    continue
+
+                placements = self.placements[var]
+                removed = False
+                csp.stats.checks += len(csp.variable_values[var])
+                for value in csp.variable_values[var]:
+                    if placements[value] & occupied:
+                        csp.remove_from_domain(var, value)
+                        removed = True
+
+                if removed:
+                    if len(csp.variable_values[var]) == 0:
+                        return None
+                    changed.append(var)
+
+    def __str__(self):
+        return "{Packing: " + str(self.variables) + "}"
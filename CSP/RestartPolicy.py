@@ -0,0 +1,48 @@
+class RestartPolicy:
+
+    # Constructor
+    # How often a randomized search is restarted: the n-th run is cut off after cutoff(n) nodes or failures
+    # @kind 'luby' (unit * 1, 1, 2, 1, 1, 2, 4, ...) or 'geometric' (unit * 1, factor, factor^2, ...)
+    # @unit the cutoff of the first run
+    # @measure what the cutoff counts: 'failures' (values that failed) or 'nodes' (values tried)
+    # @factor the growth factor of the geometric cutoffs
+    def __init__(self, kind="luby", unit=100, measure="failures", factor=1.5):
+        if kind not in ("luby", "geometric"):
+            raise ValueError("Unknown restart policy '" + str(kind) + "', expected 'luby' or 'geometric'")
+        if measure not in ("failures", "nodes"):
+            raise ValueError("Unknown restart measure '" + str(measure) + "', expected 'failures' or 'nodes'")
+        self.kind = kind
+        self.unit = unit
+        self.measure = measure
+        self.factor = factor
+
+    # Returns the cutoff of the n-th run (starting at 0)
+    def cutoff(self, n):
+        if self.kind == "luby":
+            return self.unit * luby(n + 1)
+        return int(self.unit * self.factor ** n)
+
+    def __str__(self):
+        return self.kind + " restarts, unit " + str(self.unit) + " " + self.measure
+
+# The i-th term (starting at 1) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, ...
+def luby(i):
+    while True:
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+class Cutoff:
+
+    # Constructor
+    # The budget of one run of the search
+    # @measure 'failures' or 'nodes'
+    # @limit the number of failures or nodes the run may use
+    def __init__(self, measure, limit):
+        self.measure = measure
+        self.limit = limit
+        self.count = 0
+        self.reached = False
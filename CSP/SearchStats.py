@@ -0,0 +1,53 @@
+class SearchStats:
+
+    # Constructor
+    # @self.nodes the number of values tried during search
+    # @self.backtracks the number of times the search ran out of values for a variable and backtracked
+    # @self.solutions the number of solutions found
+    # @self.checks the number of constraint checks (value pairs tested against a constraint)
+    # @self.revisions the number of calls to revise
+    # @self.pruned the number of values removed from domains by inference
+    # @self.wipeouts the number of times inference emptied a domain
+    # @self.restarts the number of times the search was restarted
+    # @self.nogoods the number of nogoods learned from restarted runs
+    # @self.build_time the time spent building the model, in seconds
+    # @self.propagation_time the time spent in inference (forward checking or MAC), in seconds
+    # @self.search_time the total time spent in search, including propagation, in seconds
+    def __init__(self):
+        self.nodes = 0
+        self.backtracks = 0
+        self.solutions = 0
+        self.checks = 0
+        self.revisions = 0
+        self.pruned = 0
+        self.wipeouts = 0
+        self.restarts = 0
+        self.nogoods = 0
+        self.build_time = 0.0
+        self.propagation_time = 0.0
+        self.search_time = 0.0
+
+    # Resets all the search counters to zero (the model build time is kept)
+    def reset(self):
+        build_time = self.build_time
+        self.__init__()
+        self.build_time = build_time
+
+    # Returns the counters as a dictionary
+    def as_dict(self):
+        return dict(vars(self))
+
+    def __str__(self):
+        return ", ".join(key + ": " + str(value) for key, value in self.as_dict().items())
+
+# Trace sink that prints every search event. Set 'csp.trace = print_trace' to watch the search 'live'.
+# A trace sink is any function taking (event, var, value), called with the events:
+#   "node" (var, value): the search tries value for var
+#   "backtrack" (var, None): no values are left for var
+#   "backjump" (var, None): with backjumping, the search jumps back to var
+#   "solution" (None, None): the assignment is complete
+#   "prune" (var, value): inference removed value from var's domain (value is None for bitset domains)
+#   "wipeout" (var, None): inference emptied var's domain
+#   "revise" (var1, var2): MAC revises the arc (var1, var2)
+def print_trace(event, var, value):
+    print(event + ": " + str(var) + ", " + str(value))
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+
+from DiskCache import DiskCache
+
+class SolutionCache:
+
+    # Constructor
+    # A two-tier cache of solutions: a small in-memory LRU cache in front of an optional persistent DiskCache,
+    # so repeated lookups in one process don't go to the disk, and solutions survive across processes.
+    # Keys are problem fingerprints (see 'caching.py')
+    # @path the on-disk database file, or None for a cache that only lives in memory
+    # @memory_size the number of entries kept in memory
+    # @disk_bytes the size bound of the on-disk cache
+    # @self.stats the counts of lookups answered from memory and from disk, misses, stores and evictions
+    def __init__(self, path=None, memory_size=1024, disk_bytes=64 * 1024 * 1024):
+        self.memory = OrderedDict()
+        self.memory_size = memory_size
+        self.disk = None
+        if path is not None:
+            self.disk = DiskCache(path, disk_bytes)
+
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "memory_evictions": 0,
+                      "disk_evictions": 0}
+
+    # Returns the value cached for the key, or None if there is none. Values found on disk are kept in memory
+    def get(self, key):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return self.memory[key]
+
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.stats["disk_hits"] += 1
+                self.remember(key, value)
+                return value
+
+        self.stats["misses"] += 1
+        return None
+
+    # Caches a value for the key, in memory and on disk
+    def put(self, key, value):
+        self.stats["stores"] += 1
+        self.remember(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+            self.stats["disk_evictions"] = self.disk.evictions
+
+    # Keeps a value in memory, evicting the least recently used one if the memory tier is full
+    def remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+            self.stats["memory_evictions"] += 1
+
+    # Returns the fraction of the lookups that were hits
+    def hit_rate(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        if lookups == 0:
+            return 0.0
+        return hits / float(lookups)
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+    def __str__(self):
+        return ", ".join(key + ": " + str(value) for key, value in self.stats.items()) + \
+            ", hit rate: %.3f" % self.hit_rate()
@@ -0,0 +1,106 @@
+class ValuePrecedenceConstraint:
+
+    # Constructor
+    # A global constraint that breaks the symmetry of interchangeable values: going through the variables in order,
+    # a value can only be used once the values before it have been used (the first variable takes the first value,
+    # the next new value is the second one, and so on). Out of every set of solutions that only differ by a
+    # permutation of the values, exactly one satisfies it
+    # @variables the list of integers corresponding to the variables, in precedence order
+    # @values the interchangeable values, in precedence order
+    def __init__(self, variables, values):
+        self.variables = list(variables)
+        self.values = list(values)
+
+        # The position of each value in the precedence order
+        self.positions = {}
+        for i in range(len(self.values)):
+            self.positions[self.values[i]] = i
+
+    # Checks to see if a specific variable is involved in the constraint
+    def involves(self, var):
+        return var in self.variables
+
+    # Takes a variable out of the precedence order
+    def remove_variable(self, var):
+        self.variables.remove(var)
+
+    # Adds a variable at the end of the precedence order
+    def add_variable(self, var):
+        self.variables.append(var)
+
+    # Checks to see if no assigned value comes before every variable that could take the value before it
+    def is_satisfied(self, assignment):
+        used = set()
+        open_before = False
+        for var in self.variables:
+            value = assignment[var]
+            if value is None:
+                open_before = True
+                continue
+            i = self.positions.get(value)
+            if i is not None and i > 0 and not open_before and self.values[i - 1] not in used:
+                return False
+            used.add(value)
+        return True
+
+    # Propagates the precedence of each value over the next one: the next value cannot be taken up to (and at)
+    # the first variable that can take the value, and if it is taken before the second variable that can take the
+    # value, the first one has to take it. Repeats until nothing changes. Returns the list of variables whose
+    # domains changed, or None if a domain was wiped out
+    def propagate(self, csp):
+        changed = []
+        changing = True
+        while changing:
+            changing = False
+            for i in range(1, len(self.values)):
+                result = self.propagate_pair(csp, self.values[i - 1], self.values[i], changed)
+                if result is None:
+                    return None
+                changing = changing or result
+        return changed
+
+    # Propagates the precedence of value s over value t. Returns whether a domain changed, or None on a wipeout
+    def propagate_pair(self, csp, s, t, changed):
+        domains = csp.variable_values
+        removed = False
+
+        # Up to the first variable that can take s, no variable can take t
+        alpha = len(self.variables)
+        for i in range(len(self.variables)):
+            var = self.variables[i]
+            if s in domains[var]:
+                alpha = i
+                break
+            if t in domains[var]:
+                csp.remove_from_domain(var, t)
+                changed.append(var)
+                removed = True
+                if len(domains[var]) == 0:
+                    return None
+
+        if alpha == len(self.variables):
+            return removed
+
+        # Neither can the first variable that can take s (which keeps s, so it is not wiped out)
+        first = self.variables[alpha]
+        if t in domains[first]:
+            csp.remove_from_domain(first, t)
+            changed.append(first)
+            removed = True
+
+        # A variable that must take t before the second variable that can take s forces the first one to s
+        for i in range(alpha + 1, len(self.variables)):
+            var = self.variables[i]
+            if s in domains[var]:
+                break
+            if len(domains[var]) == 1 and t in domains[var]:
+                if len(domains[first]) > 1:
+                    csp.reduce_domain(first, s)
+                    changed.append(first)
+                    removed = True
+                break
+
+        return removed
+
+    def __str__(self):
+        return "{ValuePrecedence: " + str(self.values) + " over " + str(self.variables) + "}"
@@ -2,293 +2,574 @@
 # date: 10/17/17
 
 import random
-
-# Each 3-line block of code below runs the heuristics specified in the comment
-# Toggle comments to enable/disable heuristics and inference
-# (to uncomment/re-comment, highlight block of code and hit Command(Ctrl for PC) '/')
-def backtracking_search(csp):
-
-    # Basic backtrack, no heuristics or inferences
-    print("\n**** Basic Backtrack ****\n")
-    result = backtrack_basic(csp.assignment, csp)
-
-    # # Forward-checking
-    # print("\n**** Forward-checking Backtrack ****\n")
-    # result = backtrack_fc(csp.assignment, csp)
-
-    # # FC and MRV heuristic
-    # print("\n**** Forward-checking Backtrack with MRV Heuristic ****\n")
-    # result = backtrack_mrv(csp.assignment, csp)
-
-    # # FC and LCV heuristic
-    # print("\n**** Forward-checking Backtrack with LCV Heuristic ****\n")
-    # result = backtrack_lcv(csp.assignment, csp)
-
-    # # FC, MRV, and LCV heuristic
-    # print("\n**** Forward-checking Backtrack with MRC and LCV Heuristic ****\n")
-    # result = backtrack_mrv_lcv(csp.assignment, csp)
-
-    # # MAC Inference (Toggle heuristics in the function backtrack_mac below)
-    # print("\n**** MAC Inference ****\n")
-    # result = backtrack_mac(csp.assignment, csp)
-
-    # DO NOT TOUCH
-    return result
+import time
+
+from DomWdeg import DomWdeg
+from NogoodStore import NogoodStore
+from RestartPolicy import Cutoff, RestartPolicy
+
+# Solves the CSP with the given search configuration and returns the first solution, or None if there is none
+# Each part of the configuration can be given by name (see SELECTORS, ORDERINGS and INFERENCES) or as a function
+# @select the variable selection heuristic
+# @order the value ordering heuristic
+# @inference the inference run after each consistent assignment
+# @seed the seed for the random value ordering, for reproducible runs (None for an unseeded run)
+# @restarts optional RestartPolicy (or its kind, 'luby' or 'geometric') to restart the search with
+# @backjump whether to backjump to the variable that caused each failure instead of backtracking chronologically
+def solve(csp, select="chronological", order="random", inference="none", seed=None, restarts=None, backjump=False):
+    if restarts is not None:
+        if backjump:
+            raise ValueError("Backjumping cannot be combined with restarts")
+        if not isinstance(restarts, RestartPolicy):
+            restarts = RestartPolicy(restarts)
+        return solve_with_restarts(csp, select, order, inference, seed, restarts)
+    return first_solution(solutions(csp, select, order, inference, seed, backjump))
+
+# Solves the CSP with randomized restarts: each run is cut off after the number of failures (or nodes) given by
+# the restart policy, and the branches it had refuted are kept as nogoods that the later runs enforce.
+# The runs share one random number generator, so the whole sequence is reproducible from the seed
+def solve_with_restarts(csp, select, order, inference, seed, policy):
+    select = resolve(SELECTORS, select, "variable selection")
+    order = resolve(ORDERINGS, order, "value ordering")
+    inference = resolve(INFERENCES, inference, "inference")
+    rng = random.Random(seed)
+    nogoods = NogoodStore()
+
+    run = 0
+    while True:
+        cutoff = Cutoff(policy.measure, policy.cutoff(run))
+        result = first_solution(search(csp.assignment, csp, select, order, inference, rng, cutoff, nogoods))
+
+        # The run ended without being cut off: it either found a solution or proved there is none
+        if not cutoff.reached:
+            return result
+
+        csp.stats.restarts += 1
+        csp.stats.nogoods = len(nogoods)
+        run += 1
+
+# Same as solve, but returns a generator of all the solutions (or of the first 'limit' ones).
+# The CSP is left as it was once the generator is exhausted or closed, so it can be solved again
+def solutions(csp, select="chronological", order="random", inference="none", seed=None, backjump=False,
+              limit=None):
+    select = resolve(SELECTORS, select, "variable selection")
+    order = resolve(ORDERINGS, order, "value ordering")
+    inference = resolve(INFERENCES, inference, "inference")
+    generator = search(csp.assignment, csp, select, order, inference, random.Random(seed), backjump=backjump)
+    if limit is None:
+        return generator
+    return take(generator, limit)
+
+# Counts the solutions of the CSP (up to the limit, if one is given) without keeping them
+def count_solutions(csp, select="chronological", order="random", inference="none", seed=None, backjump=False,
+                    limit=None):
+    count = 0
+    for solution in solutions(csp, select, order, inference, seed, backjump, limit):
+        count += 1
+    return count
+
+# Re-solves the CSP after it was changed (see the editing methods of ConstraintSatisfactionProblem), starting
+# from a previous solution. Only the variables whose previous values no longer fit (they have none, their value
+# was taken out of their domain, or it breaks a constraint) are searched, with the other variables fixed to their
+# previous values. If that fails, the neighbors of the searched variables are freed as well, and so on until the
+# whole problem is searched, so a small change costs a small search. The variables try their previous values
+# first. Returns the new solution, or None if there is none.
+# The search configuration is given as in solve()
+# @previous the previous solution (a list of values, which may be shorter than the current number of variables)
+def repair(csp, previous, select="dom_wdeg", order="random", inference="fc", seed=None, backjump=False):
+    select = resolve(SELECTORS, select, "variable selection")
+    order = prefer_previous(previous, resolve(ORDERINGS, order, "value ordering"))
+    inference = resolve(INFERENCES, inference, "inference")
+    rng = random.Random(seed)
+
+    variables = [var for var in range(csp.num_var) if var not in csp.removed_variables]
+    region = conflicted_variables(csp, previous, variables)
+    while True:
+        fixed = {}
+        for var in variables:
+            if var not in region:
+                fixed[var] = previous[var]
+
+        solution = first_solution(restricted_solutions(csp, region, select, order, inference, rng, fixed, backjump))
+        if solution is not None or len(region) == len(variables):
+            return solution
+        region = grow_region(csp, region, variables)
+
+# Returns the set of variables whose previous values no longer fit
+def conflicted_variables(csp, previous, variables):
+    conflicted = set()
+    candidate = [None] * csp.num_var
+    for var in variables:
+        value = None
+        if var < len(previous):
+            value = previous[var]
+        if value is None or value not in csp.variable_values[var]:
+            conflicted.add(var)
+        else:
+            candidate[var] = value
+
+    for constraint in csp.constraints:
+        if not constraint.is_satisfied(candidate):
+            conflicted.update(constraint.variable_pair)
+    for constraint in csp.global_constraints:
+        if not constraint.is_satisfied(candidate):
+            conflicted.update(constraint.variables)
+
+    return conflicted
+
+# Adds the neighbors of the region's variables (through binary and global constraints) to the region, or all the
+# variables if it has no neighbors left
+def grow_region(csp, region, variables):
+    grown = set(region)
+    for var in region:
+        grown.update(csp.var_connections[var])
+        for i in csp.var_globals[var]:
+            grown.update(csp.global_constraints[i].variables)
+
+    if len(grown) == len(region):
+        return set(variables)
+    return grown
+
+# Returns a value ordering that puts the variable's previous value first, and the others in the given order
+def prefer_previous(previous, order):
+    def order_previous(csp, var, values, rng):
+        values = order(csp, var, values, rng)
+        if var < len(previous) and previous[var] in values:
+            values.remove(previous[var])
+            values.insert(0, previous[var])
+        return values
+    return order_previous
+
+# Yields the first 'limit' solutions of a search, then closes it
+def take(solutions, limit):
+    try:
+        count = 0
+        while count < limit:
+            solution = next(solutions, None)
+            if solution is None:
+                return
+            count += 1
+            yield solution
+    finally:
+        solutions.close()
+
+# Looks up a configuration part by name, or returns it as is if it is already a function
+def resolve(table, part, kind):
+    if callable(part):
+        return part
+    if part not in table:
+        raise ValueError("Unknown " + kind + " '" + str(part) + "', expected one of: " + ", ".join(sorted(table)))
+    return table[part]
+
+# Variable selection: select an unassigned variable chronologically
+def select_chronological(csp):
+    return csp.chronological_select()
+
+# Variable selection: select an unassigned variable using MRV heuristic, backed by a heap of domain sizes
+def select_mrv(csp):
+    return attach_heuristic(csp, False).select()
+
+# Variable selection: select the unassigned variable with the smallest domain size / weighted degree,
+# where constraints gain weight every time they cause a domain wipeout
+def select_dom_wdeg(csp):
+    return attach_heuristic(csp, True).select()
+
+# Returns the DomWdeg selection state attached to the CSP, attaching a new one if needed
+def attach_heuristic(csp, weighted):
+    if csp.var_heuristic is None or csp.var_heuristic.weighted != weighted:
+        csp.var_heuristic = DomWdeg(csp, weighted, csp.learned_weights)
+    return csp.var_heuristic
+
+# Value ordering: randomly order the values in the domain of the variable
+def order_random(csp, var, values, rng):
+    rng.shuffle(values)
+    return values
+
+# Value ordering: sort the (shuffled) values into ascending order based on least-constraining properties
+def order_lcv(csp, var, values, rng):
+    rng.shuffle(values)
+    return csp.lcv(var, values)
+
+# Inference: none, only the consistency check against the partial assignment
+def infer_none(csp, var, value):
+    return True
+
+# Inference: forward checking
+def infer_fc(csp, var, value):
+    return csp.forward_check(var, value)
+
+# Inference: maintaining arc consistency
+def infer_mac(csp, var, value):
+    return csp.mac(var, value)
+
+# The configuration parts that can be selected by name
+SELECTORS = {"chronological": select_chronological, "mrv": select_mrv, "dom_wdeg": select_dom_wdeg}
+ORDERINGS = {"random": order_random, "lcv": order_lcv}
+INFERENCES = {"none": infer_none, "fc": infer_fc, "mac": infer_mac}
+
+# The named backtracking strategies: (variable selection, value ordering, inference)
+STRATEGIES = {
+    "basic": ("chronological", "random", "none"),
+    "fc": ("chronological", "random", "fc"),
+    "mrv": ("mrv", "random", "fc"),
+    "lcv": ("chronological", "lcv", "fc"),
+    "mrv_lcv": ("mrv", "lcv", "fc"),
+    "mac": ("chronological", "random", "mac"),
+    "dom_wdeg": ("dom_wdeg", "random", "mac"),
+}
+
+# Iterative backtracking search. Instead of recursing once per variable, the search keeps an explicit
+# stack with one frame per assigned variable: [variable, ordered values, index of the next value, trail mark].
+# It is a generator that yields a copy of each complete assignment as it is found, so the caller can stop
+# after the first solution or keep going for more
+# @select the variable selection function, e.g. select_mrv
+# @order the value ordering function, e.g. order_lcv
+# @inference the inference function run after each consistent assignment, e.g. infer_fc
+# @rng the random number generator used by the value ordering
+# @cutoff optional Cutoff: when its budget runs out, the search records its refuted branches in nogoods,
+#   restores the CSP to the state it started from, sets cutoff.reached and stops
+# @nogoods optional NogoodStore whose nogoods are checked on every assignment. The search then keeps the conflict
+#   sets of the variables on the stack as backjumping does, and the variables blamed for each value refuted, so the
+#   nogoods only hold the decisions to blame
+# @backjump whether to use conflict-directed backjumping: each variable on the stack keeps the set of earlier
+#   variables blamed for the failures of its values, and when it runs out of values the search jumps straight
+#   back to the deepest of them (see conflict_culprits and explain)
+def search(assignment, csp, select, order, inference, rng=random, cutoff=None, nogoods=None, backjump=False):
+    stats = csp.stats
+    start = time.perf_counter()
+
+    # If the assignment is already complete (i. e. there are no unassigned variables), it is the only solution
+    if csp.assignment_complete():
+        stats.solutions += 1
+        stats.search_time += time.perf_counter() - start
+        yield list(assignment)
+        return
+
+    # Propagate the global constraints once before the search, to cut problems they prove unsolvable at the root
+    root = csp.trail_mark()
+    if not csp.propagate_root():
+        csp.undo(root)
+        stats.search_time += time.perf_counter() - start
+        return
+
+    # Backjumping state: the level of each variable on the stack, its conflict set, and the variables blamed for
+    # each of its values that were refuted ((var, value) -> set). Domain removals can be blamed on the variable
+    # at whose level they were made if the inference only looks at the constraints of the assigned variable and
+    # the global constraints (see explain)
+    levels = {}
+    conflicts = {}
+    refutations = {}
+    local = inference is infer_none or inference is infer_fc
+    learning = backjump or nogoods is not None
+
+    # The CSP is restored to the state the search started from when the search ends or the generator is closed
+    # (e.g. after the first solution), so the same model can be searched again
+    stack = []
+    try:
+        push_frame(csp, stack, levels, conflicts, select, order, rng)
+
+        while len(stack) > 0:
+            frame = stack[-1]
+            var = frame[0]
+            values = frame[1]
+
+            # Undo the domain changes and the assignment made for the previous value of this variable
+            if frame[3] is not None:
+                csp.undo(frame[3])
+                assignment[var] = None
+
+            # If no values are left for the variable, add it back to the unassigned variables set and backtrack
+            if frame[2] == len(values):
+                stack.pop()
+                csp.replace_unassigned(var)
+                stats.backtracks += 1
+                if csp.trace is not None:
+                    csp.trace("backtrack", var, None)
+                if backjump:
+                    jump_back(assignment, csp, stack, levels, conflicts, var, local, nogoods)
+                elif learning and len(stack) > 0:
+                    back(csp, stack, conflicts, refutations, var, local, nogoods)
+                continue
+
+            # Stop if the budget of this run is used up, keeping what the run learned
+            if cutoff is not None and cutoff.count >= cutoff.limit:
+                cut_off(csp, stack, refutations, cutoff, nogoods)
+                stats.search_time += time.perf_counter() - start
+                return
+
+            value = values[frame[2]]
+            frame[2] += 1
+            stats.nodes += 1
+            if csp.trace is not None:
+                csp.trace("node", var, value)
+
+            # Mark the trail so the domain changes made for this value can be undone
+            frame[3] = csp.trail_mark()
+            csp.conflict = None
+
+            if cutoff is not None and cutoff.measure == "nodes":
+                cutoff.count += 1
+
+            consistent = csp.is_consistent(assignment, value, var)
+            if consistent and nogoods is not None:
+                consistent = nogoods.check(csp, assignment, var, value)
+            if consistent:
+                propagation_start = time.perf_counter()
+                consistent = inference(csp, var, value)
+                stats.propagation_time += time.perf_counter() - propagation_start
+
+            if not consistent:
+                if cutoff is not None and cutoff.measure == "failures":
+                    cutoff.count += 1
+                if learning:
+                    culprits = conflict_culprits(csp, stack, var, local, nogoods)
+                    conflicts[var].update(culprits)
+                    refutations[(var, value)] = culprits
+                continue
+
+            if csp.assignment_complete():
+                stats.solutions += 1
+                if csp.trace is not None:
+                    csp.trace("solution", None, None)
+
+                # The values after a solution are not refuted by anything, so when looking for more solutions
+                # every variable on the stack has to go back to the one just below it
+                if learning:
+                    for i in range(1, len(stack)):
+                        conflicts[stack[i][0]].add(stack[i - 1][0])
+
+                # Time spent by the caller between solutions is not search time
+                stats.search_time += time.perf_counter() - start
+                yield list(assignment)
+                start = time.perf_counter()
+            else:
+                push_frame(csp, stack, levels, conflicts, select, order, rng)
+    finally:
+        unwind(assignment, csp, stack, root)
+
+    stats.search_time += time.perf_counter() - start
+
+# Cuts off a run of the search: records the refuted branches as nogoods before the stack is unwound
+def cut_off(csp, stack, refutations, cutoff, nogoods):
+    if nogoods is not None:
+        nogoods.record(csp, stack, refutations)
+    cutoff.reached = True
+
+# Unwinds the search stack, undoing every assignment and domain change back to the state the search started from
+def unwind(assignment, csp, stack, root):
+    while len(stack) > 0:
+        frame = stack.pop()
+        if frame[3] is not None:
+            csp.undo(frame[3])
+        assignment[frame[0]] = None
+        csp.replace_unassigned(frame[0])
+
+    csp.undo(root)
+
+# Backjumps from a variable that has run out of values (and was already popped off the stack): its conflict set,
+# plus the variables blamed for the values removed from its domain before it was tried, is passed on to the deepest
+# variable in it, and every variable above that one is unassigned. If nothing is to blame, there are no solutions
+# left and the whole stack is unwound
+def jump_back(assignment, csp, stack, levels, conflicts, var, local, nogoods=None):
+    conflict = conflicts[var] | explain(csp, stack, [var], local, nogoods)
+    conflict.discard(var)
+
+    # Variables that are not on the stack were assigned before the search started, so they cannot be jumped to
+    target = None
+    for culprit in conflict:
+        if culprit in levels and (target is None or levels[culprit] > levels[target]):
+            target = culprit
+
+    while len(stack) > 0 and stack[-1][0] != target:
+        frame = stack.pop()
+        if frame[3] is not None:
+            csp.undo(frame[3])
+        assignment[frame[0]] = None
+        csp.replace_unassigned(frame[0])
+
+    if target is not None:
+        conflict.discard(target)
+        conflicts[target].update(conflict)
+        if csp.trace is not None:
+            csp.trace("backjump", target, None)
+
+# Backtracks chronologically from a variable that has run out of values (and was already popped off the stack):
+# its conflict set, plus the variables blamed for the values removed from its domain before it was tried, refutes
+# the current value of the variable below it
+def back(csp, stack, conflicts, refutations, var, local, nogoods):
+    frame = stack[-1]
+    conflict = conflicts[var] | explain(csp, stack, [var], local, nogoods)
+    conflict.discard(var)
+    conflict.discard(frame[0])
+    conflicts[frame[0]].update(conflict)
+    refutations[(frame[0], frame[1][frame[2] - 1])] = conflict
+
+# Returns the variables to blame for the failure of the current value of var: the other assigned variables of the
+# constraint (or nogood) that failed (csp.conflict), plus the ones blamed for the domains of its unassigned
+# variables. If the inference failed without saying where, every variable on the stack is blamed
+def conflict_culprits(csp, stack, var, local, nogoods=None):
+    if csp.conflict is None:
+        return set(frame[0] for frame in stack[:-1])
+
+    constraint = csp.conflict[1]
+    if hasattr(constraint, "variable_pair"):
+        scope = constraint.variable_pair
+    else:
+        scope = constraint.variables
+
+    culprits = set()
+    unassigned = []
+    for other in scope:
+        if other in csp.unassigned_variables:
+            unassigned.append(other)
+        else:
+            culprits.add(other)
+
+    culprits.update(explain(csp, stack, unassigned, local, nogoods))
+    culprits.discard(var)
+    return culprits
+
+# Returns the assigned variables to blame for the current domains of the unassigned variables.
+# With local inference (none, or forward checking), the values are only ever removed by the constraints of the
+# variable being assigned, or by the global constraints from the domains and values of their own variables. So the
+# variables to blame are the assigned variables of the global constraints on the unassigned ones (and on the
+# unassigned variables of those, and so on), and the ones at whose levels any of these domains changed on the
+# trail. Otherwise propagation can go through other unassigned variables, so the ones to blame are all the assigned
+# variables around the connected unassigned part of the constraint graph they are in.
+# Values removed by nogoods are blamed on the variables of the nogoods as well (see NogoodStore.blame)
+def explain(csp, stack, variables, local, nogoods=None):
+    blamed = set()
+    if len(variables) == 0:
+        return blamed
+
+    if local:
+        targets = set(variables)
+        pending = list(variables)
+        while len(pending) > 0:
+            var = pending.pop()
+            for i in csp.var_globals[var]:
+                for other in csp.global_constraints[i].variables:
+                    if other in targets:
+                        continue
+                    if other in csp.unassigned_variables:
+                        targets.add(other)
+                        pending.append(other)
+                    else:
+                        blamed.add(other)
+
+        trail = csp.trail
+        for i in range(len(stack)):
+            mark = stack[i][3]
+            if mark is None or stack[i][0] in blamed:
+                continue
+            end = len(trail)
+            if i < len(stack) - 1 and stack[i + 1][3] is not None:
+                end = stack[i + 1][3]
+            for j in range(mark, end):
+                if trail[j][2] in targets:
+                    blamed.add(stack[i][0])
+                    break
+        if nogoods is not None:
+            for var in targets:
+                blamed.update(nogoods.blame(csp, var))
+        return blamed
+
+    seen = set(variables)
+    pending = list(variables)
+    while len(pending) > 0:
+        var = pending.pop()
+        neighbors = []
+        if csp.var_connections[var] is not None:
+            neighbors = list(csp.var_connections[var])
+        for i in csp.var_globals[var]:
+            neighbors.extend(csp.global_constraints[i].variables)
+
+        for neighbor in neighbors:
+            if neighbor in seen:
+                continue
+            seen.add(neighbor)
+            if neighbor in csp.unassigned_variables:
+                pending.append(neighbor)
+            else:
+                blamed.add(neighbor)
+
+        if nogoods is not None:
+            blamed.update(nogoods.blame(csp, var))
+
+    return blamed
+
+# Selects the next variable and pushes its search frame, with an empty conflict set
+def push_frame(csp, stack, levels, conflicts, select, order, rng):
+    var = select(csp)
+    values = order(csp, var, list(csp.variable_values[var]), rng)
+    stack.append([var, values, 0, None])
+    levels[var] = len(stack) - 1
+    conflicts[var] = set()
+
+# Runs the backtracking search over only the given variables, the others staying unassigned or fixed to the given
+# values. The CSP's set of unassigned variables and its variable selection state are swapped out during the
+# search and put back after, and the fixed variables are unassigned again
+# @fixed optional dictionary of values for variables outside of the search; the values of the searched variables
+#   that disagree with them are pruned before the search
+def restricted_solutions(csp, variables, select, order, inference, rng, fixed=None, backjump=False):
+    unassigned = csp.unassigned_variables
+    heuristic = csp.var_heuristic
+    csp.unassigned_variables = set(variables)
+    csp.var_heuristic = None
+    if fixed is None:
+        fixed = {}
+
+    mark = csp.trail_mark()
+    generator = None
+    try:
+        for var, value in fixed.items():
+            csp.assignment[var] = value
+            csp.reduce_domain(var, value)
+        for var, value in fixed.items():
+            if any(neighbor in csp.unassigned_variables for neighbor in csp.var_connections[var]):
+                if not csp.forward_check(var, value):
+                    return
+
+        generator = search(csp.assignment, csp, select, order, inference, rng, backjump=backjump)
+        for solution in generator:
+            yield solution
+    finally:
+        if generator is not None:
+            generator.close()
+        csp.undo(mark)
+        for var in fixed:
+            csp.assignment[var] = None
+        csp.unassigned_variables = unassigned
+        csp.var_heuristic = heuristic
+
+# Returns the first solution of a search, or None if there is none. The search is closed right away,
+# which restores the CSP
+def first_solution(solutions):
+    for solution in solutions:
+        solutions.close()
+        return solution
+    return None
 
 # The most basic backtracker, with no forward-checking or heuristics
 def backtrack_basic(assignment, csp):
-    # If the assignment is complete (i. e. there are no unassigned variables left), return the assignment
-    if csp.assignment_complete():
-        return assignment
-
-    # Otherwise, select an unassigned variable chronologically
-    var = csp.chronological_select()
-
-    # Get the domain of the unassigned variable
-    values = list(csp.variable_values[var])
-
-    # Randomly get the values in the domain of the variable
-    random.shuffle(values)
-
-    # Loop through the values
-    for value in values:
-        # print("Variable: " + str(var) + ", " + "value: " + str(value))
-        # If the value is consistent with the partial assignment, recursively call backtrack
-        if csp.is_consistent(assignment, value, var):
-            # print("Value " + str(value) + " is consistent!\n")
-            result = backtrack_basic(assignment, csp)
-
-            # If the result is not a failure, return the result
-            if result is not None:
-                return result
-
-    # print("No values consistent for var: " + str(var) + "\n")
-
-    # If no consistent value found for a variable, add it back to the unassigned variables set
-    csp.replace_unassigned(var)
-
-    # Case where no solution is found
-    return None
+    return first_solution(search(assignment, csp, select_chronological, order_random, infer_none))
 
 # Backtracker with forward-checking but no heuristics
 def backtrack_fc(assignment, csp):
-
-    # If the assignment is complete (i. e. there are no unassigned variables left), return the assignment
-    if csp.assignment_complete():
-        return assignment
-
-    # Otherwise, select an unassigned variable chronologically
-    var = csp.chronological_select()
-
-    # Get the domain of the unassigned variable
-    values = list(csp.variable_values[var])
-
-    # Randomly get the values in the domain of the variable
-    random.shuffle(values)
-
-    # Loop through the values
-    for value in values:
-        # print("Variable: " + str(var) + ", " + "value: " + str(value))
-
-        # Save the initial state of all the variable domains
-        original_domains = list(csp.variable_values)
-
-        if csp.is_consistent(assignment, value, var):
-            # Forward check
-            forward_check = csp.forward_check(var, value)
-
-            # print("     Domains: " + str(csp.variable_values) + "\n")
-
-            # Backtrack if forward checking is successful
-            if forward_check:
-                result = backtrack_fc(assignment, csp)
-                if result is not None:
-                    return result
-
-        # Restores the initial domains of the variables
-        csp.variable_values = list(original_domains)
-
-    # If no consistent value found for a variable, add it back to the unassigned variables set
-    csp.replace_unassigned(var)
-
-    return None
+    return first_solution(search(assignment, csp, select_chronological, order_random, infer_fc))
 
 # Backtracker with forward-checking and the MRV heuristic
 def backtrack_mrv(assignment, csp):
-
-    # If the assignment is complete (i. e. there are no unassigned variables left), return the assignment
-    if csp.assignment_complete():
-        return assignment
-
-    # Otherwise, select an unassigned variable using MRV heuristic
-    var = csp.mrv_select()
-
-    # Get the domain of the unassigned variable
-    values = list(csp.variable_values[var])
-
-    # Randomly get the values in the domain of the variable
-    random.shuffle(values)
-
-    # Loop through the values
-    for value in values:
-        # print("Variable: " + str(var) + ", " + "value: " + str(value))
-
-        # Save the initial state of all the variable domains
-        original_domains = list(csp.variable_values)
-
-        if csp.is_consistent(assignment, value, var):
-            # Forward check
-            forward_check = csp.forward_check(var, value)
-
-            # print("     Domains: " + str(csp.variable_values) + "\n")
-
-            # Backtrack if forward checking is successful
-            if forward_check:
-                result = backtrack_mrv(assignment, csp)
-                if result is not None:
-                    return result
-
-        # Restores the initial domains of the variables: ***COMMENT OUT IF NOT USING MRV***
-        csp.variable_values = list(original_domains)
-
-    # If no consistent value found for a variable, add it back to the unassigned variables set
-    csp.replace_unassigned(var)
-
-    return None
-
+    return first_solution(search(assignment, csp, select_mrv, order_random, infer_fc))
 
 # Backtracker with forward-checking and the LCV heuristic
 def backtrack_lcv(assignment, csp):
-
-    # If the assignment is complete (i. e. there are no unassigned variables left), return the assignment
-    if csp.assignment_complete():
-        return assignment
-
-    # Otherwise, select an unassigned variable chronologically
-    var = csp.chronological_select()
-
-    # Get the domain of the unassigned variable
-    values = list(csp.variable_values[var])
-    random.shuffle(values)
-    # print("Shuffled: " + str(values))
-
-    # Sort the values into ascending order based on least-constraining properties
-    values = csp.lcv(var, values)
-    # print("Ordered using LCV: " + str(values))
-
-    # Loop through the values
-    for value in values:
-        # print("Variable: " + str(var) + ", " + "value: " + str(value))
-
-        # Save the initial state of all the variable domains
-        original_domains = list(csp.variable_values)
-
-        if csp.is_consistent(assignment, value, var):
-            # Forward check
-            forward_check = csp.forward_check(var, value)
-
-            # print("     Domains: " + str(csp.variable_values) + "\n")
-
-            # Backtrack if forward checking is successful
-            if forward_check:
-                result = backtrack_lcv(assignment, csp)
-                if result is not None:
-                    return result
-
-        # Restores the initial domains of the variables: ***COMMENT OUT IF NOT USING MRV***
-        csp.variable_values = list(original_domains)
-
-    # If no consistent value found for a variable, add it back to the unassigned variables set
-    csp.replace_unassigned(var)
-
-    return None
+    return first_solution(search(assignment, csp, select_chronological, order_lcv, infer_fc))
 
 # Backtracker with forward-checking, MRV, and LCV
 def backtrack_mrv_lcv(assignment, csp):
+    return first_solution(search(assignment, csp, select_mrv, order_lcv, infer_fc))
 
-    # If the assignment is complete (i. e. there are no unassigned variables left), return the assignment
-    if csp.assignment_complete():
-        return assignment
-
-    # Otherwise, select an unassigned variable using MRV heuristic
-    var = csp.mrv_select()
-
-    # Get the domain of the unassigned variable
-    values = list(csp.variable_values[var])
-    random.shuffle(values)
-    # print("Shuffled: " + str(values))
-
-    # Sort the values into ascending order based on least-constraining properties
-    values = csp.lcv(var, values)
-    # print("Ordered using LCV: " + str(values))
-
-    # Loop through the values
-    for value in values:
-        # print("Variable: " + str(var) + ", " + "value: " + str(value))
-
-        # Save the initial state of all the variable domains
-        original_domains = list(csp.variable_values)
-
-        if csp.is_consistent(assignment, value, var):
-            # Forward check
-            forward_check = csp.forward_check(var, value)
-            # print("     Domains: " + str(csp.variable_values) + "\n")
-            if forward_check:
-
-                result = backtrack_mrv_lcv(assignment, csp)
-                if result is not None:
-                    return result
-
-        # Restores the initial domains of the variables: ***COMMENT OUT IF NOT USING MRV***
-        csp.variable_values = list(original_domains)
-
-    # If no consistent value found for a variable, add it back to the unassigned variables set
-    csp.replace_unassigned(var)
-
-    return None
-
-# Backtracker with MAC inference (to add MRV and/or LCV, toggle with comment blocks below)
+# Backtracker with MAC inference (use solve(csp, select="mrv", order="lcv", inference="mac") to add heuristics)
 def backtrack_mac(assignment, csp):
-
-    # If the assignment is complete (i. e. there are no unassigned variables left), return the assignment
-    if csp.assignment_complete():
-        return assignment
-
-    # # MRV Heuristic
-    # var = csp.mrv_select()
-
-    # Chronological Select
-    var = csp.chronological_select()
-
-    # Get the domain of the unassigned variable
-    values = list(csp.variable_values[var])
-
-    # Randomize values
-    random.shuffle(values)
-
-    # # LCV Heuristic
-    # values = csp.lcv(var, values)
-
-    # Loop through the values
-    for value in values:
-        # print("Variable: " + str(var) + ", " + "value: " + str(value))
-
-        # Save the initial state of all the variable domains
-        original_domains = list(csp.variable_values)
-
-        if csp.is_consistent(assignment, value, var):
-            # Run MAC
-            mac = csp.mac(var, value)
-            # print("     Domains: " + str(csp.variable_values) + "\n")
-            if mac:
-                result = backtrack_mac(assignment, csp)
-                if result is not None:
-                    return result
-
-        # Restores the initial domains of the variables: ***COMMENT OUT IF NOT USING MRV***
-        csp.variable_values = list(original_domains)
-
-    # If no consistent value found for a variable, add it back to the unassigned variables set
-    csp.replace_unassigned(var)
-
-    return None
\ No newline at end of file
+    return first_solution(search(assignment, csp, select_chronological, order_random, infer_mac))
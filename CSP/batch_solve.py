@@ -0,0 +1,296 @@
+# Batch solving: solves a stream of instances on a pool of worker processes and writes each result, as a line of
+# JSON, as soon as it is ready. Only a bounded number of instances are read ahead of the results, so memory stays
+# flat however long the batch is
+#   python batch_solve.py instances.jsonl -o results.jsonl [--workers 8] [--strategy mac] [--node-limit 100000]
+#   python batch_solve.py instances_dir/ --kind board
+# The instances are either:
+#   - a JSON Lines file (or '-' for standard input), one instance per line: {"id": ..., "kind": "map" or "board",
+#     "file": path} or {"id": ..., "kind": ..., "text": the instance in the input file format}. "id" defaults to
+#     the line number and "kind" to the kind guessed from the instance
+#   - a directory of instance files in the input file formats, solved in name order
+# Each result has the instance's "id", "kind", "status" ("solved", "unsatisfiable", "limit" if the node limit was
+# reached, or "error" with the "error"), the "solution" (see readable_solution), the search counters and the
+# build, search and total "time" in seconds. Results come in the order they finish
+
+import argparse
+import concurrent.futures
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from CircuitBoardCSP import CircuitBoardCSP
+from MapColoringCSP import MapColoringCSP
+from RestartPolicy import Cutoff
+from backtracking_search import INFERENCES, ORDERINGS, SELECTORS, STRATEGIES, first_solution, resolve, search
+
+PROBLEMS = {"map": MapColoringCSP, "board": CircuitBoardCSP}
+
+# The search configuration of a worker process, set up once by init_worker
+worker = {}
+
+# Solves a stream of instances (dictionaries as in a JSON Lines file) in a pool of worker processes, and yields
+# the results as they finish. At most 'max_in_flight' instances are handed out and not yet yielded at any time.
+# The search configuration is given as in solve() in 'backtracking_search.py'
+# @workers the number of processes (default: the number of CPUs)
+# @max_in_flight the bound on the instances in flight (default: twice the number of workers)
+# @node_limit optional number of nodes each search may use
+def batch_results(instances, select="mrv", order="random", inference="fc", seed=None, backjump=False,
+                  workers=None, max_in_flight=None, node_limit=None, bitset=False, extensional=False):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+    if workers < 1 or max_in_flight < 1:
+        raise ValueError("A batch needs at least one worker and one instance in flight")
+
+    config = (select, order, inference, seed, backjump, node_limit, bitset, extensional)
+    executor = ProcessPoolExecutor(workers, initializer=init_worker, initargs=config)
+    pending = {}
+    try:
+        for index, instance in enumerate(instances):
+            pending[executor.submit(solve_instance, index, instance)] = (index, instance)
+
+            # The next instance is only read once there is room for it
+            while len(pending) >= max_in_flight:
+                executor, results = wait_results(executor, pending, workers, config)
+                for result in results:
+                    yield result
+
+        while len(pending) > 0:
+            executor, results = wait_results(executor, pending, workers, config)
+            for result in results:
+                yield result
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+# Waits for at least one of the pending instances to finish, and returns (the executor to go on with, the results
+# of the finished instances). A worker process that dies (killed for memory, crashed) breaks the executor, and every
+# instance in flight fails with BrokenProcessPool. Those are solved again side by side, each in a process of its
+# own, so the instance that kills its worker is reported as an error and the others still get their results
+# @pending the instance (index, instance) of each future in flight, from which the finished ones are removed
+def wait_results(executor, pending, workers, config):
+    done = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)[0]
+    results = []
+    suspects = []
+    for future in done:
+        collect(future, pending.pop(future), results, suspects)
+
+    if len(suspects) == 0:
+        return (executor, results)
+
+    # The executor is broken, so the other instances in flight are lost as well
+    for future in concurrent.futures.wait(pending)[0]:
+        collect(future, pending[future], results, suspects)
+    pending.clear()
+    executor.shutdown(wait=True)
+
+    # Each one is solved in an executor of its own, 'workers' at a time, so a worker that dies again only takes its
+    # own instance down
+    suspects.sort(key=lambda suspect: suspect[0])
+    for start in range(0, len(suspects), workers):
+        isolated = {}
+        for task in suspects[start:start + workers]:
+            single = ProcessPoolExecutor(1, initializer=init_worker, initargs=config)
+            isolated[single.submit(solve_instance, task[0], task[1])] = (task, single)
+
+        for future in concurrent.futures.wait(isolated)[0]:
+            task = isolated[future][0]
+            try:
+                results.append(future.result())
+            except BrokenProcessPool:
+                results.append(error_result(task[0], task[1], "The worker process died while solving the instance"))
+            except Exception as e:
+                results.append(error_result(task[0], task[1], repr(e)))
+            isolated[future][1].shutdown(wait=True)
+
+    return (ProcessPoolExecutor(workers, initializer=init_worker, initargs=config), results)
+
+# Adds the result of a finished future to the results, or its instance to the suspects if its executor broke
+def collect(future, task, results, suspects):
+    try:
+        results.append(future.result())
+    except BrokenProcessPool:
+        suspects.append(task)
+    except Exception as e:
+        results.append(error_result(task[0], task[1], repr(e)))
+
+# Sets up the search configuration of a worker process
+def init_worker(select, order, inference, seed, backjump, node_limit, bitset, extensional):
+    worker["select"] = resolve(SELECTORS, select, "variable selection")
+    worker["order"] = resolve(ORDERINGS, order, "value ordering")
+    worker["inference"] = resolve(INFERENCES, inference, "inference")
+    worker["seed"] = seed
+    worker["backjump"] = backjump
+    worker["node_limit"] = node_limit
+    worker["bitset"] = bitset
+    worker["extensional"] = extensional
+
+# Worker task: builds and solves one instance. Returns its result (see the top of the file)
+def solve_instance(index, instance):
+    start = time.perf_counter()
+    result = {"id": index, "kind": None}
+    try:
+        result["id"] = instance.get("id", index)
+        filename = instance.get("file")
+        text = instance.get("text")
+        if filename is None and text is None:
+            raise ValueError("The instance has neither a 'file' nor a 'text'")
+
+        # The problem classes read files, so instances given as text go through a temporary file
+        if filename is None:
+            f = tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False)
+            f.write(text)
+            f.close()
+            try:
+                result["kind"] = instance.get("kind") or guess_kind(f.name)
+                problem = PROBLEMS[result["kind"]](f.name, worker["bitset"], worker["extensional"])
+            finally:
+                os.remove(f.name)
+        else:
+            result["kind"] = instance.get("kind") or guess_kind(filename)
+            problem = PROBLEMS[result["kind"]](filename, worker["bitset"], worker["extensional"])
+
+        csp = problem.int_csp
+        cutoff = None
+        if worker["node_limit"] is not None:
+            cutoff = Cutoff("nodes", worker["node_limit"])
+        solution = first_solution(search(csp.assignment, csp, worker["select"], worker["order"],
+                                         worker["inference"], random.Random(worker["seed"]), cutoff,
+                                         backjump=worker["backjump"]))
+
+        if solution is not None:
+            result["status"] = "solved"
+        elif cutoff is not None and cutoff.reached:
+            result["status"] = "limit"
+        else:
+            result["status"] = "unsatisfiable"
+        result["solution"] = readable_solution(problem, solution)
+        result.update(csp.stats.as_dict())
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = repr(e)
+
+    result["time"] = time.perf_counter() - start
+    return result
+
+# Returns the solution as it goes in a result: the color of each region of a map, or the position of each piece of
+# a board (as the cell number of its corner, in the order of the file)
+def readable_solution(problem, solution):
+    if solution is None or isinstance(problem, CircuitBoardCSP):
+        return solution
+    return {problem.variables[var]: problem.domain[solution[var]] for var in range(len(solution))}
+
+# The result of an instance whose task failed outside of solve_instance (e.g. it could not be sent to the worker,
+# or the worker died)
+def error_result(index, instance, error):
+    result = {"id": index, "kind": None, "status": "error", "error": error}
+    if isinstance(instance, dict):
+        result["id"] = instance.get("id", index)
+        result["kind"] = instance.get("kind")
+    return result
+
+# Guesses the kind of an instance file from its first line: boards start with their dimensions ('nxm')
+def guess_kind(filename):
+    f = open(filename)
+    first_line = f.readline().strip()
+    f.close()
+    if re.fullmatch(r"\d+x\d+", first_line):
+        return "board"
+    return "map"
+
+# Reads the instances of a JSON Lines stream one line at a time. Lines that are not valid JSON give instances
+# without a file, which come out as errors
+def read_jsonl(stream):
+    line_num = 0
+    for line in stream:
+        line = line.strip()
+        if len(line) > 0:
+            try:
+                instance = json.loads(line)
+            except ValueError:
+                instance = {"id": line_num}
+            if not isinstance(instance, dict):
+                instance = {"id": line_num}
+            instance.setdefault("id", line_num)
+            yield instance
+        line_num += 1
+
+# Yields the instance files of a directory, in name order
+# @kind 'map' or 'board', or None to guess the kind of each file
+def read_directory(path, kind=None):
+    for name in sorted(os.listdir(path)):
+        filename = os.path.join(path, name)
+        if os.path.isfile(filename):
+            yield {"id": name, "kind": kind, "file": filename}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a stream of map-coloring and circuit-board instances on a "
+                                                 "pool of worker processes.")
+    parser.add_argument("instances", help="a JSON Lines file of instances ('-' for standard input), or a directory "
+                                          "of instance files")
+    parser.add_argument("-o", "--output", help="write the results to this JSON Lines file (default: standard output)")
+    parser.add_argument("--kind", choices=sorted(PROBLEMS), help="the kind of the instances (default: guessed)")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default: number of CPUs)")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="most instances read ahead of the results (default: twice the number of workers)")
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), default="mrv",
+                        help="named backtracking strategy (default: mrv)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random value ordering")
+    parser.add_argument("--backjump", action="store_true", help="use conflict-directed backjumping")
+    parser.add_argument("--node-limit", type=int, default=None,
+                        help="give up on an instance after this many search nodes (status 'limit')")
+    parser.add_argument("--no-solutions", action="store_true", help="leave the solutions out of the results")
+    parser.add_argument("--bitset", action="store_true", help="store domains as bitmasks")
+    parser.add_argument("--extensional", action="store_true",
+                        help="build the lists of allowable value pairs instead of using the relations directly")
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.max_in_flight is not None and args.max_in_flight < 1:
+        parser.error("--max-in-flight must be at least 1")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    parts = STRATEGIES[args.strategy]
+
+    stream = None
+    if os.path.isdir(args.instances):
+        instances = read_directory(args.instances, args.kind)
+    else:
+        stream = sys.stdin if args.instances == "-" else open(args.instances)
+        instances = read_jsonl(stream)
+        if args.kind is not None:
+            instances = (dict(instance, kind=instance.get("kind") or args.kind) for instance in instances)
+
+    output = sys.stdout if args.output is None else open(args.output, "w")
+    counts = {}
+    start = time.perf_counter()
+    try:
+        for result in batch_results(instances, parts[0], parts[1], parts[2], args.seed, args.backjump, args.workers,
+                                    args.max_in_flight, args.node_limit, args.bitset, args.extensional):
+            if args.no_solutions:
+                result.pop("solution", None)
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if stream is not None and stream is not sys.stdin:
+            stream.close()
+
+    summary = ", ".join(status + ": " + str(count) for status, count in sorted(counts.items()))
+    print("instances: " + str(sum(counts.values())) + " (" + summary + ") in %.3fs" % (time.perf_counter() - start),
+          file=sys.stderr)
+    return 0 if "error" not in counts else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
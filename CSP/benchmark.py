@@ -0,0 +1,223 @@
+# Benchmark suite for the backtracking strategies
+#   python benchmark.py run [--quick] [-o results.json]    times every strategy on the generated instances
+#   python benchmark.py compare old.json new.json          flags regressions between two runs
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from CircuitBoardCSP import CircuitBoardCSP
+from MapColoringCSP import MapColoringCSP
+from backtracking_search import STRATEGIES, solve
+from generate_instances import planar_map, random_board, random_map
+
+PROBLEMS = {"map": MapColoringCSP, "board": CircuitBoardCSP}
+
+# The benchmark instances: (name, problem kind, generator, generator arguments)
+SUITE = [
+    ("random_map_30", "map", random_map, (30, 4, 0.15, 1)),
+    ("random_map_100", "map", random_map, (100, 4, 0.04, 2)),
+    ("planar_map_200", "map", planar_map, (200, 4, 3)),
+    ("planar_map_1000", "map", planar_map, (1000, 4, 4)),
+    ("board_8x8", "board", random_board, (8, 8, 6, 0.2, 5)),
+    ("board_12x10", "board", random_board, (12, 10, 8, 0.25, 6)),
+]
+
+QUICK_SUITE = ["random_map_30", "planar_map_200", "board_8x8"]
+
+# Builds the model from the instance file and solves it once, measuring time and search counters, then does it
+# again with tracemalloc on to measure peak memory. Tracing slows down every allocation, so the times come from the
+# untraced run only
+def run_once(kind, filename, strategy, seed, bitset, extensional):
+    start = time.perf_counter()
+    problem = PROBLEMS[kind](filename, bitset, extensional)
+    build_time = time.perf_counter() - start
+
+    csp = problem.int_csp
+    parts = STRATEGIES[strategy]
+    start = time.perf_counter()
+    result = solve(csp, parts[0], parts[1], parts[2], seed)
+    search_time = time.perf_counter() - start
+
+    # The counters come from the CSP's statistics, the times are measured around the whole build and search
+    record = csp.stats.as_dict()
+    record.update({
+        "status": "solved" if result is not None else "unsatisfiable",
+        "build_time": build_time,
+        "search_time": search_time,
+        "peak_memory": peak_memory(kind, filename, strategy, seed, bitset, extensional),
+    })
+    return record
+
+# Builds the model and solves it with tracemalloc on, and returns the peak memory traced, in bytes
+def peak_memory(kind, filename, strategy, seed, bitset, extensional):
+    tracemalloc.start()
+    try:
+        problem = PROBLEMS[kind](filename, bitset, extensional)
+        parts = STRATEGIES[strategy]
+        solve(problem.int_csp, parts[0], parts[1], parts[2], seed)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+# Runs run_once in a child process, so a run that goes over the time limit can be stopped
+# and each run's peak memory is measured on its own (the time limit covers both the timed and the traced run)
+def run_with_timeout(kind, filename, strategy, seed, bitset, extensional, timeout):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=child_run,
+                                      args=(queue, kind, filename, strategy, seed, bitset, extensional))
+    process.start()
+    process.join(timeout)
+
+    if process.is_alive():
+        process.terminate()
+        process.join()
+        return {"status": "timeout"}
+
+    if queue.empty():
+        return {"status": "error"}
+    return queue.get()
+
+def child_run(queue, kind, filename, strategy, seed, bitset, extensional):
+    queue.put(run_once(kind, filename, strategy, seed, bitset, extensional))
+
+# Runs every strategy on every instance of the suite and returns the results
+def run_suite(names, strategies, seeds, bitset, extensional, timeout, directory):
+    results = []
+
+    for (name, kind, generator, arguments) in SUITE:
+        if names is not None and name not in names:
+            continue
+
+        filename = os.path.join(directory, name + ".txt")
+        f = open(filename, "w")
+        f.write(generator(*arguments))
+        f.close()
+
+        for strategy in strategies:
+            for seed in seeds:
+                record = {"instance": name, "strategy": strategy, "seed": seed, "bitset": bitset,
+                          "extensional": extensional}
+                record.update(run_with_timeout(kind, filename, strategy, seed, bitset, extensional, timeout))
+                results.append(record)
+                print(format_record(record), file=sys.stderr)
+
+    return results
+
+def format_record(record):
+    s = record["instance"] + " " + record["strategy"] + " seed=" + str(record["seed"]) + ": " + record["status"]
+    if "search_time" in record:
+        s += " build=%.3fs search=%.3fs nodes=%d backtracks=%d checks=%d peak=%dKB" % (
+            record["build_time"], record["search_time"], record["nodes"], record["backtracks"],
+            record["checks"], record["peak_memory"] // 1024)
+    return s
+
+# Compares two benchmark runs. A run is flagged as a regression if it no longer finishes, or if its
+# total time or one of its work counters grew by more than the threshold (a fraction, e.g. 0.2 for 20%)
+def compare(old_results, new_results, threshold):
+    old_runs = {}
+    for record in old_results:
+        old_runs[run_key(record)] = record
+
+    regressions = []
+    for record in new_results:
+        old = old_runs.get(run_key(record))
+        if old is None:
+            continue
+
+        if old["status"] != record["status"]:
+            if old["status"] in ("solved", "unsatisfiable") and record["status"] not in ("solved", "unsatisfiable"):
+                regressions.append((record, "status", old["status"], record["status"]))
+            continue
+
+        if "search_time" not in record:
+            continue
+
+        old_time = old["build_time"] + old["search_time"]
+        new_time = record["build_time"] + record["search_time"]
+        if new_time > old_time * (1 + threshold):
+            regressions.append((record, "time", old_time, new_time))
+
+        for counter in ("nodes", "checks", "peak_memory"):
+            if record[counter] > old[counter] * (1 + threshold):
+                regressions.append((record, counter, old[counter], record[counter]))
+
+    return regressions
+
+def run_key(record):
+    return (record["instance"], record["strategy"], record["seed"], record.get("bitset", False),
+            record.get("extensional", False))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the backtracking strategies.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmark suite")
+    run.add_argument("--quick", action="store_true", help="only run the small instances")
+    run.add_argument("--instances", nargs="+", help="names of the instances to run")
+    run.add_argument("--strategies", nargs="+", choices=sorted(STRATEGIES), default=sorted(STRATEGIES))
+    run.add_argument("--seeds", nargs="+", type=int, default=[0, 1, 2])
+    run.add_argument("--bitset", action="store_true", help="store domains as bitmasks")
+    run.add_argument("--extensional", action="store_true", help="build the lists of allowable value pairs")
+    run.add_argument("--timeout", type=float, default=60.0, help="time limit per run, in seconds")
+    run.add_argument("-o", "--output", help="JSON results file (default: print to stdout)")
+
+    comp = commands.add_parser("compare", help="compare two benchmark results files")
+    comp.add_argument("old")
+    comp.add_argument("new")
+    comp.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown (default: 0.2)")
+
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command == "run":
+        names = args.instances
+        if names is None and args.quick:
+            names = QUICK_SUITE
+
+        directory = tempfile.mkdtemp(prefix="csp_benchmark_")
+        results = run_suite(names, args.strategies, args.seeds, args.bitset, args.extensional, args.timeout,
+                            directory)
+
+        output = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+        }
+        text = json.dumps(output, indent=2)
+        if args.output is None:
+            print(text)
+        else:
+            f = open(args.output, "w")
+            f.write(text + "\n")
+            f.close()
+        return 0
+
+    f = open(args.old)
+    old = json.load(f)
+    f.close()
+    f = open(args.new)
+    new = json.load(f)
+    f.close()
+
+    regressions = compare(old["results"], new["results"], args.threshold)
+    for (record, what, old_value, new_value) in regressions:
+        print("REGRESSION " + record["instance"] + " " + record["strategy"] + " seed=" + str(record["seed"]) +
+              ": " + what + " " + str(old_value) + " -> " + str(new_value))
+    if len(regressions) == 0:
+        print("No regressions")
+        return 0
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
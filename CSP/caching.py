@@ -0,0 +1,241 @@
+# Solving through a SolutionCache. Problems are looked up by a fingerprint of their structure that doesn't depend
+# on how the file names or orders the variables, so a map with its regions renamed or listed in another order (or
+# a board with its pieces listed in another order) hits the same entry. On a hit, the problem file is only read:
+# the constraints are never generated and nothing is searched.
+#   - maps: the regions are put in a canonical order by color refinement (each region is told apart by its degree,
+#     then by the classes of its neighbors, and so on), searching over the regions to individualize when the
+#     refinement is stuck and keeping the order with the smallest list of borders (see canonical_component). The
+#     fingerprint is the hash of the number of colors and of the borders in that order, so two maps with the same
+#     fingerprint are the same graph and a cached coloring is valid for both. The order doesn't depend on the
+#     file's order, except for maps so symmetric that the search goes over its limit, which can miss but never
+#     hit a wrong entry
+#   - boards: the pieces are sorted by their dimensions, and the fingerprint is the hash of the board's dimensions
+#     and of the sorted pieces. Identical pieces are interchangeable, so any order of them works
+# The cache entries hold the solution in canonical order (or None for a problem without a solution), and are
+# mapped back to the order of the file on a hit
+
+import hashlib
+
+from CircuitBoardCSP import CircuitBoardCSP
+from MapColoringCSP import MapColoringCSP
+from backtracking_search import solve
+
+PROBLEMS = {"map": MapColoringCSP, "board": CircuitBoardCSP}
+
+# The most leaves the search for a canonical order explores in a component (see canonical_component)
+LEAF_LIMIT = 1000
+
+# Solves the problem in the file, or looks its solution up in the cache. Returns (problem, solution, hit): on a hit
+# the problem is only read (its int_csp is None), but it can still print the solution.
+# The search configuration is given as in solve() in 'backtracking_search.py'
+# @kind 'map' or 'board'
+# @cache a SolutionCache
+# @packing boards: whether to use the packing constraint (see CircuitBoardCSP) when the problem is built
+# @model optional compiled model of the problem, loaded instead of building it on a miss (see 'model_file.py')
+def solve_cached(kind, filename, cache, select="chronological", order="random", inference="none", seed=None,
+                 bitset=False, extensional=False, backjump=False, packing=True, model=None):
+    problem = PROBLEMS[kind](filename, build=False)
+    key, canonical = fingerprint(problem)
+
+    entry = cache.get(key)
+    if entry is not None:
+        return (problem, from_canonical(entry["solution"], canonical), True)
+
+    if kind == "board":
+        problem = CircuitBoardCSP(filename, bitset, extensional, packing, model=model)
+    else:
+        problem = MapColoringCSP(filename, bitset, extensional, model=model)
+    solution = solve(problem.int_csp, select, order, inference, seed, backjump=backjump)
+    cache.put(key, {"solution": to_canonical(solution, canonical)})
+    return (problem, solution, False)
+
+# Returns (fingerprint, canonical order of the variables) of a problem, which only needs to be read
+def fingerprint(problem):
+    if isinstance(problem, CircuitBoardCSP):
+        return board_fingerprint(problem)
+    return map_fingerprint(problem)
+
+# Fingerprints a map by its borders in the canonical order of its regions
+def map_fingerprint(problem):
+    num_regions = len(problem.variables)
+    adjacency = [set() for var in range(num_regions)]
+    for pair in problem.constraint_pairs:
+        adjacency[pair[0]].add(pair[1])
+        adjacency[pair[1]].add(pair[0])
+
+    canonical = canonical_order(adjacency)
+    rank = [0] * num_regions
+    for i in range(num_regions):
+        rank[canonical[i]] = i
+
+    borders = set()
+    for var in range(num_regions):
+        for neighbor in adjacency[var]:
+            if rank[var] < rank[neighbor]:
+                borders.add((rank[var], rank[neighbor]))
+
+    text = "map;" + str(num_regions) + ";" + str(len(problem.domain)) + ";" + \
+        ",".join(str(border[0]) + "-" + str(border[1]) for border in sorted(borders))
+    return (hashlib.sha256(text.encode()).hexdigest(), canonical)
+
+# Fingerprints a board by its dimensions and the dimensions of its pieces, sorted
+def board_fingerprint(problem):
+    pieces = problem.variables
+    canonical = sorted(range(len(pieces)), key=lambda i: (pieces[i].getN(), pieces[i].getM(), i))
+
+    text = "board;" + str(problem.board_n) + "x" + str(problem.board_m) + ";" + \
+        ",".join(str(pieces[i].getN()) + "x" + str(pieces[i].getM()) for i in canonical)
+    return (hashlib.sha256(text.encode()).hexdigest(), canonical)
+
+# Returns the vertices of a graph in canonical order. Each connected component is put in its canonical order (see
+# canonical_component), and the components are ordered by their size and certificate, so identical components can
+# come in any order
+def canonical_order(adjacency):
+    pieces = []
+    for component in graph_components(adjacency):
+        local = {}
+        for i in range(len(component)):
+            local[component[i]] = i
+        sub = [[local[neighbor] for neighbor in adjacency[var]] for var in component]
+
+        certificate, order = canonical_component(sub)
+        pieces.append((len(component), certificate, [component[i] for i in order]))
+
+    pieces.sort(key=lambda piece: (piece[0], piece[1]))
+    return [var for piece in pieces for var in piece[2]]
+
+# Returns the connected components of a graph, each as a sorted list of vertices
+def graph_components(adjacency):
+    seen = [False] * len(adjacency)
+    result = []
+    for start in range(len(adjacency)):
+        if seen[start]:
+            continue
+        seen[start] = True
+        component = [start]
+        for var in component:
+            for neighbor in adjacency[var]:
+                if not seen[neighbor]:
+                    seen[neighbor] = True
+                    component.append(neighbor)
+        component.sort()
+        result.append(component)
+    return result
+
+# Returns (certificate, canonical order) of a connected graph. The vertices are colored by refinement until the
+# colors are stable; while some vertices still share a color, each vertex of the first shared color is given a
+# color of its own in turn and the refinement goes on, which makes a search tree whose leaves color every vertex
+# differently. The certificate of a leaf is its sorted list of edges, with the vertices numbered by their colors,
+# and the canonical order is the order of the leaf with the smallest certificate, whatever the order of the file.
+# Two leaves with the same certificate give an automorphism of the graph, and the vertices it maps onto each
+# other (while fixing the vertices already individualized) lead to the same certificates, so only one of them
+# is tried. Graphs symmetric enough to need more than LEAF_LIMIT leaves keep the smallest certificate found by
+# then, which can depend on the file's order (they can miss, but never hit a wrong entry)
+def canonical_component(adjacency):
+    state = {"first": None, "best": None, "automorphisms": [], "leaves": 0}
+    explore(refine([len(neighbors) for neighbors in adjacency], adjacency), [], adjacency, state)
+    return state["best"]
+
+# Explores the search tree of canonical_component below a coloring, whose individualized vertices are the prefix
+def explore(colors, prefix, adjacency, state):
+    if state["leaves"] >= LEAF_LIMIT:
+        return
+
+    members = {}
+    for var in range(len(adjacency)):
+        members.setdefault(colors[var], []).append(var)
+    shared = [color for color in members if len(members[color]) > 1]
+    if len(shared) == 0:
+        leaf(colors, adjacency, state)
+        return
+
+    color = min(shared)
+    tried = []
+    for chosen in members[color]:
+        if len(tried) > 0 and in_orbit(chosen, tried, prefix, state["automorphisms"], len(adjacency)):
+            continue
+        tried.append(chosen)
+
+        individualized = []
+        for var in range(len(adjacency)):
+            if var == chosen:
+                individualized.append(2 * colors[var])
+            else:
+                individualized.append(2 * colors[var] + 1)
+        explore(refine(individualized, adjacency), prefix + [chosen], adjacency, state)
+
+# Records a leaf of the search tree: keeps it if its certificate is the smallest so far, and records the
+# automorphism between it and an earlier leaf with the same certificate
+def leaf(colors, adjacency, state):
+    state["leaves"] += 1
+    order = sorted(range(len(adjacency)), key=lambda var: colors[var])
+    edges = []
+    for var in range(len(adjacency)):
+        for neighbor in adjacency[var]:
+            if colors[var] < colors[neighbor]:
+                edges.append((colors[var], colors[neighbor]))
+    certificate = tuple(sorted(edges))
+
+    for known in (state["first"], state["best"]):
+        if known is not None and known[0] == certificate:
+            automorphism = [0] * len(adjacency)
+            for i in range(len(order)):
+                automorphism[known[1][i]] = order[i]
+            state["automorphisms"].append(automorphism)
+            break
+
+    if state["first"] is None:
+        state["first"] = (certificate, order)
+    if state["best"] is None or certificate < state["best"][0]:
+        state["best"] = (certificate, order)
+
+# Checks to see if a vertex is mapped onto one of the tried vertices by the automorphisms found that fix the prefix
+def in_orbit(var, tried, prefix, automorphisms, num_vertices):
+    parent = list(range(num_vertices))
+    for automorphism in automorphisms:
+        if all(automorphism[fixed] == fixed for fixed in prefix):
+            for v in range(num_vertices):
+                parent[find(parent, v)] = find(parent, automorphism[v])
+
+    root = find(parent, var)
+    return any(find(parent, other) == root for other in tried)
+
+# Returns the representative of a vertex's set in a union-find forest
+def find(parent, var):
+    while parent[var] != var:
+        parent[var] = parent[parent[var]]
+        var = parent[var]
+    return var
+
+# Refines a coloring of the vertices: each vertex's new color is the rank of its color together with the sorted
+# colors of its neighbors, until the number of colors stops growing. Returns the stable coloring, as ranks
+def refine(colors, adjacency):
+    num_colors = len(set(colors))
+    while True:
+        signatures = []
+        for var in range(len(adjacency)):
+            signatures.append((colors[var], tuple(sorted(colors[neighbor] for neighbor in adjacency[var]))))
+
+        ranks = {}
+        for signature in sorted(set(signatures)):
+            ranks[signature] = len(ranks)
+        colors = [ranks[signature] for signature in signatures]
+
+        if len(ranks) == num_colors:
+            return colors
+        num_colors = len(ranks)
+
+# Puts a solution into canonical order
+def to_canonical(solution, canonical):
+    if solution is None:
+        return None
+    return [solution[var] for var in canonical]
+
+# Puts a solution in canonical order back into the order of the problem's variables
+def from_canonical(values, canonical):
+    if values is None:
+        return None
+    solution = [None] * len(canonical)
+    for i in range(len(canonical)):
+        solution[canonical[i]] = values[i]
+    return solution
@@ -0,0 +1,292 @@
+# Solving a CSP by parts: the constraint graph is split into connected components, which are solved (or counted)
+# independently and combined. Each component is solved the cheapest way its structure allows:
+# - a tree of binary constraints, with directional arc consistency and a backtrack-free assignment
+# - a graph that becomes a tree once a few variables (a cycle cutset) are removed, by trying every consistent
+#   assignment of the cutset and solving the rest as a tree
+# - anything else (including every component with a global constraint that the binary constraints don't already
+#   enforce), with the backtracking search restricted to its variables
+
+import random
+
+from backtracking_search import INFERENCES, ORDERINGS, SELECTORS, first_solution, infer_none, resolve, \
+    restricted_solutions, select_chronological
+
+# Solves the CSP component by component and returns the combined solution, or None if a component has none.
+# The search configuration is given as in solve() in 'backtracking_search.py' and used for the components
+# that are not trees
+# @cutset_limit the largest cycle cutset to condition on; components that need more are searched
+def solve_decomposed(csp, select="chronological", order="random", inference="none", seed=None, cutset_limit=8):
+    select = resolve(SELECTORS, select, "variable selection")
+    order = resolve(ORDERINGS, order, "value ordering")
+    inference = resolve(INFERENCES, inference, "inference")
+    rng = random.Random(seed)
+    adjacency = constraint_graph(csp)
+
+    solution = [None] * csp.num_var
+    for component in components(csp, adjacency):
+        result = solve_component(csp, component, adjacency, select, order, inference, rng, cutset_limit)
+        if result is None:
+            return None
+        for var in component:
+            solution[var] = result[var]
+
+    return solution
+
+# Counts the solutions of the CSP as the product of the counts of its components. Trees are counted by dynamic
+# programming over the tree, without enumerating their solutions
+def count_decomposed(csp, select="chronological", order="random", inference="none", seed=None, cutset_limit=8):
+    select = resolve(SELECTORS, select, "variable selection")
+    order = resolve(ORDERINGS, order, "value ordering")
+    inference = resolve(INFERENCES, inference, "inference")
+    rng = random.Random(seed)
+    adjacency = constraint_graph(csp)
+
+    count = 1
+    for component in components(csp, adjacency):
+        count *= count_component(csp, component, adjacency, select, order, inference, rng, cutset_limit)
+        if count == 0:
+            return 0
+
+    return count
+
+# Returns the neighbors of each variable through the binary constraints
+def constraint_graph(csp):
+    adjacency = [set() for var in range(csp.num_var)]
+    for constraint in csp.constraints:
+        var1 = constraint.variable_pair[0]
+        var2 = constraint.variable_pair[1]
+        adjacency[var1].add(var2)
+        adjacency[var2].add(var1)
+    return adjacency
+
+# Returns the connected components of the CSP's variables (as sorted lists), where the variables of a global
+# constraint are all connected. Variables removed from the CSP are left out
+def components(csp, adjacency):
+    seen = [False] * csp.num_var
+    for var in csp.removed_variables:
+        seen[var] = True
+    result = []
+
+    for start in range(csp.num_var):
+        if seen[start]:
+            continue
+
+        seen[start] = True
+        component = [start]
+        for var in component:
+            neighbors = list(adjacency[var])
+            for i in csp.var_globals[var]:
+                if not is_redundant(csp.global_constraints[i]):
+                    neighbors.extend(csp.global_constraints[i].variables)
+            for neighbor in neighbors:
+                if not seen[neighbor]:
+                    seen[neighbor] = True
+                    component.append(neighbor)
+
+        component.sort()
+        result.append(component)
+
+    return result
+
+# Solves one component and returns an assignment with its variables set, or None if it has no solution
+def solve_component(csp, component, adjacency, select, order, inference, rng, cutset_limit):
+    if not has_globals(csp, component):
+        cutset = find_cutset(component, adjacency)
+        if len(cutset) <= cutset_limit:
+            return solve_with_cutset(csp, component, cutset, adjacency, order, rng)
+
+    return first_solution(restricted_solutions(csp, component, select, order, inference, rng))
+
+# Counts the solutions of one component
+def count_component(csp, component, adjacency, select, order, inference, rng, cutset_limit):
+    if not has_globals(csp, component):
+        cutset = find_cutset(component, adjacency)
+        if len(cutset) <= cutset_limit:
+            return count_with_cutset(csp, component, cutset, adjacency, order, rng)
+
+    count = 0
+    for solution in restricted_solutions(csp, component, select, order, inference, rng):
+        count += 1
+    return count
+
+# Checks to see if a global constraint involves any of the variables (other than the redundant ones)
+def has_globals(csp, variables):
+    for var in variables:
+        for i in csp.var_globals[var]:
+            if not is_redundant(csp.global_constraints[i]):
+                return True
+    return False
+
+# Checks to see if a global constraint is implied by the binary constraints (e.g. the all-different constraints
+# on the cliques of a map), so that it only adds propagation and can be left out of the structure
+def is_redundant(constraint):
+    return getattr(constraint, "redundant", False)
+
+# Finds a cycle cutset of the component: variables whose removal leaves a forest. Variables on no cycle are
+# peeled off as leaves; when only cycles are left, the variable with the most neighbors left goes in the cutset.
+# An empty cutset means the component is a tree
+def find_cutset(component, adjacency):
+    remaining = {}
+    for var in component:
+        remaining[var] = set(adjacency[var])
+
+    cutset = []
+    while True:
+        leaves = [var for var in remaining if len(remaining[var]) <= 1]
+        while len(leaves) > 0:
+            var = leaves.pop()
+            if var not in remaining:
+                continue
+            for neighbor in remaining.pop(var):
+                remaining[neighbor].discard(var)
+                if len(remaining[neighbor]) <= 1:
+                    leaves.append(neighbor)
+
+        if len(remaining) == 0:
+            return cutset
+
+        var = max(sorted(remaining), key=lambda v: len(remaining[v]))
+        cutset.append(var)
+        for neighbor in remaining.pop(var):
+            remaining[neighbor].discard(var)
+
+# Solves a component by trying the consistent assignments of the cutset one by one: the values of the other
+# variables that disagree with the cutset are removed, and the rest of the component is solved as a forest
+def solve_with_cutset(csp, component, cutset, adjacency, order, rng):
+    in_cutset = set(cutset)
+    forest = [var for var in component if var not in in_cutset]
+
+    generator = restricted_solutions(csp, cutset, select_chronological, order, infer_none, rng)
+    try:
+        for partial in generator:
+            mark = csp.trail_mark()
+            if condition(csp, cutset, forest, adjacency, partial):
+                solution = solve_forest(csp, forest, adjacency, partial)
+                if solution is not None:
+                    csp.undo(mark)
+                    return solution
+            csp.undo(mark)
+    finally:
+        generator.close()
+
+    return None
+
+# Counts the solutions of a component as the sum, over the consistent assignments of the cutset, of the number
+# of solutions of the forest left
+def count_with_cutset(csp, component, cutset, adjacency, order, rng):
+    in_cutset = set(cutset)
+    forest = [var for var in component if var not in in_cutset]
+
+    count = 0
+    for partial in restricted_solutions(csp, cutset, select_chronological, order, infer_none, rng):
+        mark = csp.trail_mark()
+        if condition(csp, cutset, forest, adjacency, partial):
+            count += count_forest(csp, forest, adjacency)
+        csp.undo(mark)
+    return count
+
+# Removes the values of the forest variables that are not supported by the values of their neighbors in the
+# cutset. Returns False if a domain was wiped out
+def condition(csp, cutset, forest, adjacency, partial):
+    in_forest = set(forest)
+    for var in cutset:
+        value = partial[var]
+        for neighbor in adjacency[var]:
+            if neighbor not in in_forest:
+                continue
+            supports = csp.find_constraint(var, neighbor).get_supports(var, value)
+            csp.stats.checks += len(csp.variable_values[neighbor])
+            for neighbor_value in list(csp.variable_values[neighbor]):
+                if neighbor_value not in supports:
+                    csp.remove_from_domain(neighbor, neighbor_value)
+            if len(csp.variable_values[neighbor]) == 0:
+                return False
+    return True
+
+# Orders each tree of the forest from its root, so that every variable comes after its parent.
+# Returns (order, parent of each variable, with None for the roots)
+def tree_order(forest, adjacency):
+    in_forest = set(forest)
+    parent = {}
+    order = []
+    for root in forest:
+        if root in parent:
+            continue
+        parent[root] = None
+        order.append(root)
+        i = len(order) - 1
+        while i < len(order):
+            var = order[i]
+            for neighbor in adjacency[var]:
+                if neighbor in in_forest and neighbor not in parent:
+                    parent[neighbor] = var
+                    order.append(neighbor)
+            i += 1
+    return order, parent
+
+# Solves a forest (a graph of binary constraints without cycles) without backtracking: directional arc
+# consistency from the leaves up leaves every value of a parent with a support in each child, so the values
+# can then be picked from the roots down. Returns the assignment with the forest's values set (starting from
+# the given one), or None if the forest has no solution
+def solve_forest(csp, forest, adjacency, assignment):
+    order, parent = tree_order(forest, adjacency)
+    solution = list(assignment)
+
+    mark = csp.trail_mark()
+    try:
+        for var in reversed(order):
+            if parent[var] is not None:
+                csp.revise(parent[var], var)
+                if len(csp.variable_values[parent[var]]) == 0:
+                    csp.wipeout(parent[var], csp.find_constraint(parent[var], var))
+                    return None
+
+        for var in order:
+            csp.stats.nodes += 1
+            if parent[var] is None:
+                candidates = csp.variable_values[var]
+                if len(candidates) == 0:
+                    return None
+                solution[var] = next(iter(candidates))
+            else:
+                supports = csp.find_constraint(parent[var], var).get_supports(parent[var], solution[parent[var]])
+                for value in csp.variable_values[var]:
+                    csp.stats.checks += 1
+                    if value in supports:
+                        solution[var] = value
+                        break
+    finally:
+        csp.undo(mark)
+
+    return solution
+
+# Counts the solutions of a forest from the leaves up: the number of solutions of the subtree under a variable
+# taking a value is the product, over its children, of the summed counts of the child's values it allows
+def count_forest(csp, forest, adjacency):
+    order, parent = tree_order(forest, adjacency)
+
+    counts = {}
+    for var in reversed(order):
+        counts[var] = {}
+        for value in csp.variable_values[var]:
+            counts[var][value] = 1
+
+    for var in reversed(order):
+        if parent[var] is None:
+            continue
+        up = parent[var]
+        constraint = csp.find_constraint(up, var)
+        for value in counts[up]:
+            supports = constraint.get_supports(up, value)
+            total = 0
+            for child_value in counts[var]:
+                csp.stats.checks += 1
+                if child_value in supports:
+                    total += counts[var][child_value]
+            counts[up][value] *= total
+
+    count = 1
+    for var in order:
+        if parent[var] is None:
+            count *= sum(counts[var].values())
+    return count
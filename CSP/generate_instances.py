@@ -0,0 +1,147 @@
+# Seeded generators of map-coloring and circuit-board instances, in the input file formats described in README.txt
+# e.g. python generate_instances.py planar-map --size 400 --colors 4 --seed 1 -o planar_400.txt
+
+import argparse
+import random
+import string
+
+COLORS = ["red", "green", "blue", "yellow", "orange", "purple", "pink", "brown", "black", "white"]
+PIECE_CHARS = string.ascii_letters + string.digits
+
+# Formats a map-coloring instance: the region names, the colors, and the bordering region pairs
+def format_map(regions, colors, borders):
+    lines = [", ".join(regions), ", ".join(colors)]
+    lines.append(", ".join(regions[i] + "-" + regions[j] for (i, j) in borders))
+    return "\n".join(lines) + "\n"
+
+# Returns the first num_colors color names
+def color_names(num_colors):
+    if num_colors <= len(COLORS):
+        return COLORS[:num_colors]
+    return COLORS + ["color" + str(i) for i in range(len(COLORS), num_colors)]
+
+# Generates a random map: every pair of the regions borders each other with probability 'density'.
+# At least one border is always generated, since the map file format needs one
+def random_map(num_regions, num_colors, density, seed):
+    rng = random.Random(seed)
+    regions = ["R" + str(i) for i in range(num_regions)]
+
+    borders = []
+    for i in range(num_regions):
+        for j in range(i + 1, num_regions):
+            if rng.random() < density:
+                borders.append((i, j))
+
+    if len(borders) == 0:
+        borders.append((0, 1))
+
+    return format_map(regions, color_names(num_colors), borders)
+
+# Generates a random planar map: the regions are laid out on a grid, each region borders the regions
+# next to it, and each grid cell gets one of its two diagonals at random (so the map stays planar)
+def planar_map(num_regions, num_colors, seed):
+    rng = random.Random(seed)
+    cols = max(2, int(num_regions ** 0.5))
+    rows = max(1, (num_regions + cols - 1) // cols)
+    regions = ["R" + str(i) for i in range(num_regions)]
+
+    borders = []
+    for r in range(rows):
+        for c in range(cols):
+            i = r * cols + c
+            right = i + 1
+            down = i + cols
+            if i >= num_regions:
+                continue
+            if c + 1 < cols and right < num_regions:
+                borders.append((i, right))
+            if down < num_regions:
+                borders.append((i, down))
+            if c + 1 < cols and down + 1 < num_regions:
+                if rng.random() < 0.5:
+                    borders.append((i, down + 1))
+                else:
+                    borders.append((right, down))
+
+    # Shuffle the region order so the search does not get the grid order for free
+    order = list(range(num_regions))
+    rng.shuffle(order)
+    shuffled_regions = [regions[k] for k in order]
+    position = {}
+    for k in range(num_regions):
+        position[order[k]] = k
+    borders = [(position[i], position[j]) for (i, j) in borders]
+
+    return format_map(shuffled_regions, color_names(num_colors), borders)
+
+# Formats a circuit-board instance: the board dimensions 'nxm' followed by each piece drawn with its character
+def format_board(board_n, board_m, pieces):
+    lines = [str(board_n) + "x" + str(board_m)]
+    for k in range(len(pieces)):
+        piece_n = pieces[k][0]
+        piece_m = pieces[k][1]
+        char = PIECE_CHARS[k % len(PIECE_CHARS)]
+        for row in range(piece_m):
+            lines.append(char * piece_n)
+    return "\n".join(lines) + "\n"
+
+# Generates a random circuit board that is known to be solvable: the board is cut into rectangles with
+# random guillotine cuts, then a fraction ('slack') of the rectangles is dropped to leave free space
+def random_board(board_n, board_m, num_pieces, slack, seed):
+    rng = random.Random(seed)
+    rectangles = [(board_n, board_m)]
+
+    # Keep cutting a random rectangle that can still be cut, until there are enough pieces
+    while len(rectangles) < num_pieces:
+        cuttable = [k for k in range(len(rectangles)) if rectangles[k][0] > 1 or rectangles[k][1] > 1]
+        if len(cuttable) == 0:
+            break
+        k = rng.choice(cuttable)
+        piece_n = rectangles[k][0]
+        piece_m = rectangles[k][1]
+        if piece_m == 1 or (piece_n > 1 and rng.random() < piece_n / float(piece_n + piece_m)):
+            cut = rng.randint(1, piece_n - 1)
+            rectangles[k:k + 1] = [(cut, piece_m), (piece_n - cut, piece_m)]
+        else:
+            cut = rng.randint(1, piece_m - 1)
+            rectangles[k:k + 1] = [(piece_n, cut), (piece_n, piece_m - cut)]
+
+    rng.shuffle(rectangles)
+    keep = max(1, len(rectangles) - int(len(rectangles) * slack))
+
+    return format_board(board_n, board_m, rectangles[:keep])
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate map-coloring and circuit-board instances.")
+    parser.add_argument("kind", choices=["random-map", "planar-map", "board"])
+    parser.add_argument("--size", type=int, default=50, help="number of regions (maps)")
+    parser.add_argument("--colors", type=int, default=4, help="number of colors (maps)")
+    parser.add_argument("--density", type=float, default=0.1, help="border probability (random-map)")
+    parser.add_argument("--board", default="10x10", help="board dimensions 'nxm' (board)")
+    parser.add_argument("--pieces", type=int, default=8, help="number of pieces to cut the board into (board)")
+    parser.add_argument("--slack", type=float, default=0.2, help="fraction of the pieces to drop (board)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="output file (default: print to stdout)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.kind == "random-map":
+        text = random_map(args.size, args.colors, args.density, args.seed)
+    elif args.kind == "planar-map":
+        text = planar_map(args.size, args.colors, args.seed)
+    else:
+        dimensions = args.board.split("x")
+        text = random_board(int(dimensions[0]), int(dimensions[1]), args.pieces, args.slack, args.seed)
+
+    if args.output is None:
+        print(text, end="")
+    else:
+        f = open(args.output, "w")
+        f.write(text)
+        f.close()
+
+
+if __name__ == "__main__":
+    main()
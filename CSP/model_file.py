@@ -0,0 +1,248 @@
+# Compiled model files: a finished ConstraintSatisfactionProblem (domains, constraint graph, support tables and
+# global constraints) written to a compact binary file, which is loaded by memory-mapping it. Loading doesn't
+# generate anything per value pair: the support tables are read from the mapped pages as the search asks for them
+# (see MappedConstraint), and every process that loads the same file shares those pages.
+# Compile a model with 'python solve_csp.py board board.txt --pairwise --compile board.model', and load it with
+# '--model board.model' (or the 'model' argument of MapColoringCSP/CircuitBoardCSP).
+#
+# Layout (little-endian):
+#   header: magic, version, number of variables, binary constraints and global constraints, flags (SYMMETRY if
+#     the symmetry was broken when the model was built), and the SHA-256 digest of the problem file the model was
+#     compiled from (zeros if none)
+#   domain index: for each variable, the offset of its values, plus the end offset of the last one
+#   constraint index: for each binary constraint, its two variables and the offsets of its two support tables
+#   global index: for each global constraint, its kind and the offset of its data
+#   data: the values of each domain (int32), the support tables (for each value of one variable, a row of bits
+#     over the other variable's domain) and the data of the global constraints
+
+import hashlib
+import mmap
+import struct
+import time
+
+from AllDifferentConstraint import AllDifferentConstraint
+from ConstraintSatisfactionProblem import ConstraintSatisfactionProblem
+from MappedConstraint import MappedConstraint, MappedMasks
+from PackingConstraint import PackingConstraint
+from ValuePrecedenceConstraint import ValuePrecedenceConstraint
+
+MAGIC = b"CSPM"
+VERSION = 2
+HEADER = struct.Struct("<4sIIIII32s")
+CONSTRAINT_ENTRY = struct.Struct("<IIQQ")
+GLOBAL_ENTRY = struct.Struct("<IQ")
+
+# The flags of a model
+SYMMETRY = 1
+
+# The kinds of global constraints
+PACKING = 1
+ALL_DIFFERENT = 2
+VALUE_PRECEDENCE = 3
+
+# Returns the SHA-256 digest of a file, which ties a compiled model to the problem file it was compiled from
+def file_digest(filename):
+    f = open(filename, "rb")
+    digest = hashlib.sha256(f.read()).digest()
+    f.close()
+    return digest
+
+# Writes the CSP to a compiled model file. The CSP must not be in the middle of a search, and its variables must
+# all be in the problem (see remove_variable). Returns the size of the file
+# @source the digest of the problem file (see file_digest), or None
+# @symmetry whether the CSP was built with its symmetry broken, so that the solutions of the loaded model are
+#   counted with the symmetric solutions they stand for (see model_symmetry)
+def compile_model(csp, path, source=None, symmetry=False):
+    if len(csp.trail) > 0 or len(csp.removed_variables) > 0:
+        raise ValueError("Only a complete model can be compiled, between searches")
+
+    domains = [list(csp.variable_values[var]) for var in range(csp.num_var)]
+    data = bytearray()
+
+    domain_offsets = []
+    for values in domains:
+        domain_offsets.append(len(data))
+        data += struct.pack("<%di" % len(values), *values)
+    domain_offsets.append(len(data))
+
+    constraint_entries = []
+    for constraint in csp.constraints:
+        var1 = constraint.variable_pair[0]
+        var2 = constraint.variable_pair[1]
+        forward = len(data)
+        data += support_table(csp, constraint, var1, var2, domains)
+        backward = len(data)
+        data += support_table(csp, constraint, var2, var1, domains)
+        constraint_entries.append((var1, var2, forward, backward))
+
+    global_entries = []
+    for constraint in csp.global_constraints:
+        global_entries.append((global_kind(constraint), len(data)))
+        data += global_data(constraint, domains)
+
+    # The offsets are relative to the data, which comes after the header and the indices
+    base = HEADER.size + 8 * len(domain_offsets) + CONSTRAINT_ENTRY.size * len(constraint_entries) + \
+        GLOBAL_ENTRY.size * len(global_entries)
+
+    f = open(path, "wb")
+    f.write(HEADER.pack(MAGIC, VERSION, csp.num_var, len(constraint_entries), len(global_entries),
+                        SYMMETRY if symmetry else 0, source or bytes(32)))
+    f.write(struct.pack("<%dQ" % len(domain_offsets), *[base + offset for offset in domain_offsets]))
+    for entry in constraint_entries:
+        f.write(CONSTRAINT_ENTRY.pack(entry[0], entry[1], base + entry[2], base + entry[3]))
+    for entry in global_entries:
+        f.write(GLOBAL_ENTRY.pack(entry[0], base + entry[1]))
+    f.write(data)
+    size = f.tell()
+    f.close()
+    return size
+
+# Returns the support table of the arc (var, neighbor): a row of bits over the neighbor's domain for each value
+# of var. The support masks of bitset domains are the rows themselves
+def support_table(csp, constraint, var, neighbor, domains):
+    masks = csp.support_masks.get((var, neighbor))
+    row_bytes = (len(domains[neighbor]) + 7) // 8
+
+    table = bytearray()
+    for value in domains[var]:
+        if masks is not None:
+            mask = masks[value]
+        else:
+            supports = constraint.get_supports(var, value)
+            mask = 0
+            for i in range(len(domains[neighbor])):
+                if domains[neighbor][i] in supports:
+                    mask |= 1 << i
+        table += mask.to_bytes(row_bytes, "little")
+    return bytes(table)
+
+# Returns the kind of a global constraint, or fails if it cannot be compiled
+def global_kind(constraint):
+    if isinstance(constraint, PackingConstraint):
+        return PACKING
+    if isinstance(constraint, AllDifferentConstraint):
+        return ALL_DIFFERENT
+    if isinstance(constraint, ValuePrecedenceConstraint):
+        return VALUE_PRECEDENCE
+    raise ValueError("Cannot compile the global constraint " + str(constraint))
+
+# Returns the data of a global constraint:
+#   packing: number of pieces, number of cells, the pieces, their areas, then the occupancy masks of each piece's
+#     placements (one row of bits over the cells for each value, in domain order)
+#   all-different: whether it is redundant, number of variables, the variables
+#   value precedence: number of variables, number of values, the variables, the values
+def global_data(constraint, domains):
+    variables = constraint.variables
+    if isinstance(constraint, PackingConstraint):
+        row_bytes = (constraint.num_cells + 7) // 8
+        data = bytearray(struct.pack("<II", len(variables), constraint.num_cells))
+        data += struct.pack("<%dI" % len(variables), *variables)
+        data += struct.pack("<%dI" % len(variables), *[constraint.areas[var] for var in variables])
+        for var in variables:
+            for value in domains[var]:
+                data += constraint.placements[var][value].to_bytes(row_bytes, "little")
+        return bytes(data)
+
+    if isinstance(constraint, AllDifferentConstraint):
+        return struct.pack("<II%dI" % len(variables), int(constraint.redundant), len(variables), *variables)
+
+    values = constraint.values
+    return struct.pack("<II%dI%di" % (len(variables), len(values)), len(variables), len(values), *(variables + values))
+
+# Loads a compiled model file into a ConstraintSatisfactionProblem over the memory-mapped file
+# @bitset whether the CSP stores its domains as bitmasks (the support masks are then read from the file)
+# @source the digest of the problem file the model should have been compiled from (see file_digest), or None
+def load_model(path, bitset=False, source=None):
+    start = time.perf_counter()
+    f = open(path, "rb")
+    buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    f.close()
+
+    header = read_header(buffer, path)
+    if source is not None and header[6] != source:
+        raise ValueError(path + " was not compiled from this problem file")
+    num_var = header[2]
+    num_constraints = header[3]
+    num_globals = header[4]
+
+    offset = HEADER.size
+    domain_offsets = struct.unpack_from("<%dQ" % (num_var + 1), buffer, offset)
+    offset += 8 * (num_var + 1)
+
+    # The values of each domain, and the position of each value in it (shared by all the tables of the variable)
+    domains = []
+    positions = []
+    for var in range(num_var):
+        size = (domain_offsets[var + 1] - domain_offsets[var]) // 4
+        values = list(struct.unpack_from("<%di" % size, buffer, domain_offsets[var]))
+        domains.append(values)
+        positions.append({value: i for i, value in enumerate(values)})
+
+    view = memoryview(buffer)
+    constraints = []
+    connections = [[] for var in range(num_var)]
+    for i in range(num_constraints):
+        entry = CONSTRAINT_ENTRY.unpack_from(buffer, offset + i * CONSTRAINT_ENTRY.size)
+        var1 = entry[0]
+        var2 = entry[1]
+        forward = MappedMasks(view, entry[2], (len(domains[var2]) + 7) // 8, domains[var1], positions[var1])
+        backward = MappedMasks(view, entry[3], (len(domains[var1]) + 7) // 8, domains[var2], positions[var2])
+        constraints.append(MappedConstraint((var1, var2), forward, backward))
+        connections[var1].append(var2)
+        connections[var2].append(var1)
+    offset += num_constraints * CONSTRAINT_ENTRY.size
+
+    global_constraints = []
+    for i in range(num_globals):
+        entry = GLOBAL_ENTRY.unpack_from(buffer, offset + i * GLOBAL_ENTRY.size)
+        global_constraints.append(load_global(view, entry[0], entry[1], num_var, domains, positions))
+
+    csp = ConstraintSatisfactionProblem(num_var, connections, domains, constraints, bitset, global_constraints)
+    csp.stats.build_time = time.perf_counter() - start
+    return csp
+
+# Checks to see if the model was compiled from a CSP built with its symmetry broken
+def model_symmetry(path):
+    f = open(path, "rb")
+    header = read_header(f.read(HEADER.size), path)
+    f.close()
+    return header[5] & SYMMETRY != 0
+
+# Returns the fields of the header of a compiled model, or fails if it isn't one
+def read_header(buffer, path):
+    if len(buffer) < HEADER.size:
+        raise ValueError(path + " is not a compiled model")
+    header = HEADER.unpack_from(buffer, 0)
+    if header[0] != MAGIC or header[1] != VERSION:
+        raise ValueError(path + " is not a compiled model (or was compiled by another version)")
+    return header
+
+# Rebuilds a global constraint from its data (see global_data)
+def load_global(view, kind, offset, num_var, domains, positions):
+    if kind == PACKING:
+        counts = struct.unpack_from("<II", view, offset)
+        variables = list(struct.unpack_from("<%dI" % counts[0], view, offset + 8))
+        variable_areas = struct.unpack_from("<%dI" % counts[0], view, offset + 8 + 4 * counts[0])
+
+        row_bytes = (counts[1] + 7) // 8
+        placements = [{} for var in range(num_var)]
+        areas = [0] * num_var
+        start = offset + 8 + 8 * counts[0]
+        for i in range(len(variables)):
+            var = variables[i]
+            placements[var] = MappedMasks(view, start, row_bytes, domains[var], positions[var])
+            areas[var] = variable_areas[i]
+            start += len(domains[var]) * row_bytes
+        return PackingConstraint(variables, placements, areas, counts[1])
+
+    if kind == ALL_DIFFERENT:
+        counts = struct.unpack_from("<II", view, offset)
+        return AllDifferentConstraint(struct.unpack_from("<%dI" % counts[1], view, offset + 8), counts[0] == 1)
+
+    if kind == VALUE_PRECEDENCE:
+        counts = struct.unpack_from("<II", view, offset)
+        variables = struct.unpack_from("<%dI" % counts[0], view, offset + 8)
+        values = struct.unpack_from("<%di" % counts[1], view, offset + 8 + 4 * counts[0])
+        return ValuePrecedenceConstraint(variables, values)
+
+    raise ValueError("Unknown global constraint kind " + str(kind))
@@ -0,0 +1,273 @@
+# Parallel search for counting or enumerating all the solutions of a problem. The search space is split into
+# independent subproblems by fixing the values of the first few variables, and the subproblems are handed out
+# to a pool of worker processes one at a time, so the workers that get easy subproblems go on to the next ones
+#   python parallel_search.py count map planar_200.txt [--workers 8] [--strategy mrv]
+#   python parallel_search.py enumerate board board.txt
+# With a compiled model (see 'model_file.py'), the workers all map the same file instead of building the model.
+# When enumerating, the workers send their solutions back in chunks through a bounded queue as they find them, so
+# neither the workers nor the parent hold more than a few chunks, however many solutions a subproblem has
+
+import argparse
+import multiprocessing
+import os
+import queue
+import random
+import time
+
+from CircuitBoardCSP import CircuitBoardCSP
+from MapColoringCSP import MapColoringCSP
+from backtracking_search import INFERENCES, ORDERINGS, SELECTORS, STRATEGIES, resolve, search
+
+PROBLEMS = {"map": MapColoringCSP, "board": CircuitBoardCSP}
+
+# The model and search configuration of a worker process, set up once by init_worker
+worker = {}
+
+# The number of solutions a worker sends back at a time, and the number of chunks per worker that can wait in the
+# queue before the workers wait for the parent to catch up
+SOLUTION_CHUNK = 64
+QUEUED_CHUNKS = 2
+
+# Splits the search space into subproblems, each a list of decisions (var, value) on the same variables.
+# The variables are fixed one at a time, most constrained first, until there are at least 'target' subproblems
+# (or every variable is fixed). Decisions that the inference proves to have no solution are dropped, so every
+# solution of the problem is a solution of exactly one subproblem
+def split(csp, target, inference):
+    variables = [var for var in range(csp.num_var) if var not in csp.removed_variables]
+    order = sorted(variables, key=lambda v: (-(len(csp.var_constraints[v]) + len(csp.var_globals[v])), v))
+
+    root = csp.trail_mark()
+    if not csp.propagate_root():
+        csp.undo(root)
+        return []
+
+    subproblems = [[]]
+    depth = 0
+    while len(subproblems) < target and depth < len(order):
+        var = order[depth]
+        expanded = []
+        for decisions in subproblems:
+            for value in list_values(csp, decisions, var, inference):
+                expanded.append(decisions + [(var, value)])
+        subproblems = expanded
+        depth += 1
+
+    csp.undo(root)
+    return subproblems
+
+# Returns the values of var that are consistent after making the decisions, restoring the CSP afterwards
+def list_values(csp, decisions, var, inference):
+    values = []
+    mark = csp.trail_mark()
+    if assign_decisions(csp, decisions, inference):
+        for value in list(csp.variable_values[var]):
+            value_mark = csp.trail_mark()
+            if assign_decisions(csp, [(var, value)], inference):
+                values.append(value)
+            retract_decisions(csp, [(var, value)], value_mark)
+    retract_decisions(csp, decisions, mark)
+    return values
+
+# Makes the decisions: assigns each value, checks it and runs the inference on it, as the search would.
+# Returns False as soon as one of them fails. Either way, retract_decisions undoes them
+def assign_decisions(csp, decisions, inference):
+    for (var, value) in decisions:
+        csp.unassigned_variables.discard(var)
+        if csp.var_heuristic is not None:
+            csp.var_heuristic.assigned(var)
+        if not csp.is_consistent(csp.assignment, value, var):
+            return False
+        if not inference(csp, var, value):
+            return False
+    return True
+
+# Undoes the decisions and the domain changes made since the mark
+def retract_decisions(csp, decisions, mark):
+    csp.undo(mark)
+    for (var, value) in reversed(decisions):
+        csp.assignment[var] = None
+        if var not in csp.unassigned_variables:
+            csp.replace_unassigned(var)
+
+# Builds the model and search configuration of a worker process
+# @solutions optional queue the worker sends the solutions it enumerates to
+def init_worker(kind, filename, bitset, extensional, model, select, order, inference, seed, backjump,
+                solutions=None):
+    worker["csp"] = PROBLEMS[kind](filename, bitset, extensional, model=model).int_csp
+    worker["select"] = resolve(SELECTORS, select, "variable selection")
+    worker["order"] = resolve(ORDERINGS, order, "value ordering")
+    worker["inference"] = resolve(INFERENCES, inference, "inference")
+    worker["seed"] = seed
+    worker["backjump"] = backjump
+    worker["solutions"] = solutions
+
+# Yields the solutions of one subproblem in the worker's model, restoring the model when done
+def subproblem_solutions(decisions):
+    csp = worker["csp"]
+    mark = csp.trail_mark()
+    try:
+        if assign_decisions(csp, decisions, worker["inference"]):
+            for solution in search(csp.assignment, csp, worker["select"], worker["order"], worker["inference"],
+                                   random.Random(worker["seed"]), backjump=worker["backjump"]):
+                yield solution
+    finally:
+        retract_decisions(csp, decisions, mark)
+
+# Worker task: counts the solutions of one subproblem. Returns (count, search statistics)
+def count_subproblem(decisions):
+    csp = worker["csp"]
+    csp.stats.reset()
+    count = 0
+    for solution in subproblem_solutions(decisions):
+        count += 1
+    return (count, search_stats(csp))
+
+# Worker task: lists the solutions of one subproblem, putting them on the worker's queue as
+# ("solutions", up to SOLUTION_CHUNK solutions) as they are found, then ("done", search statistics)
+def enumerate_subproblem(decisions):
+    csp = worker["csp"]
+    csp.stats.reset()
+    chunk = []
+    for solution in subproblem_solutions(decisions):
+        chunk.append(solution)
+        if len(chunk) == SOLUTION_CHUNK:
+            worker["solutions"].put(("solutions", chunk))
+            chunk = []
+    if len(chunk) > 0:
+        worker["solutions"].put(("solutions", chunk))
+    worker["solutions"].put(("done", search_stats(csp)))
+
+# Returns the search statistics of a worker task (the model was built once for all of the worker's tasks)
+def search_stats(csp):
+    stats = csp.stats.as_dict()
+    del stats["build_time"]
+    return stats
+
+# Splits the problem into subproblems and starts a pool of worker processes to work on them.
+# Returns (pool, subproblems)
+# @split_factor the number of subproblems per worker: more give better load balancing, but cost more to split
+# @solutions optional queue the workers send the solutions they enumerate to
+def start_pool(kind, filename, select, order, inference, seed, backjump, workers, bitset, extensional, split_factor,
+               model, solutions=None):
+    csp = PROBLEMS[kind](filename, bitset, extensional, model=model).int_csp
+    subproblems = split(csp, workers * split_factor, resolve(INFERENCES, inference, "inference"))
+
+    pool = multiprocessing.Pool(workers, init_worker,
+                                (kind, filename, bitset, extensional, model, select, order, inference, seed,
+                                 backjump, solutions))
+    return (pool, subproblems)
+
+# Runs a task on every subproblem of the problem in a pool of worker processes, and yields the results as they
+# come in. The pool is shut down when the generator is closed
+def run_subproblems(task, kind, filename, select, order, inference, seed, backjump, workers, bitset, extensional,
+                    split_factor, model):
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    pool, subproblems = start_pool(kind, filename, select, order, inference, seed, backjump, workers, bitset,
+                                   extensional, split_factor, model)
+    try:
+        for result in pool.imap_unordered(task, subproblems):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+# Counts the solutions of the problem in the file in parallel. Returns (count, search statistics summed over
+# the workers); the count is the same as the sequential search's.
+# The search configuration is given as in solve() in 'backtracking_search.py'
+# @model optional compiled model of the problem file (see 'model_file.py'), loaded by every worker
+def count_solutions(kind, filename, select="mrv", order="random", inference="fc", seed=None, backjump=False,
+                    workers=None, bitset=False, extensional=False, split_factor=8, model=None):
+    count = 0
+    stats = {}
+    for result in run_subproblems(count_subproblem, kind, filename, select, order, inference, seed, backjump,
+                                  workers, bitset, extensional, split_factor, model):
+        count += result[0]
+        add_stats(stats, result[1])
+    return (count, stats)
+
+# Same as count_solutions, but returns a generator of all the solutions, in the order the workers find them.
+# The solutions come through a queue of at most QUEUED_CHUNKS chunks per worker, and the workers wait while it is
+# full, so the solutions are never all held in memory. The pool is shut down when the generator is closed
+def parallel_solutions(kind, filename, select="mrv", order="random", inference="fc", seed=None, backjump=False,
+                       workers=None, bitset=False, extensional=False, split_factor=8, model=None):
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    solutions = multiprocessing.Queue(QUEUED_CHUNKS * workers)
+    pool, subproblems = start_pool(kind, filename, select, order, inference, seed, backjump, workers, bitset,
+                                   extensional, split_factor, model, solutions)
+    try:
+        tasks = pool.map_async(enumerate_subproblem, subproblems, chunksize=1)
+        done = 0
+        while done < len(subproblems):
+            try:
+                message = solutions.get(timeout=0.1)
+            except queue.Empty:
+                # A task that failed raises its exception here
+                if tasks.ready() and not tasks.successful():
+                    tasks.get()
+                continue
+
+            if message[0] == "done":
+                done += 1
+            else:
+                for solution in message[1]:
+                    yield solution
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+# Adds one worker's search statistics to the totals
+def add_stats(totals, stats):
+    for key, value in stats.items():
+        totals[key] = totals.get(key, 0) + value
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Count or enumerate all the solutions of a map-coloring or "
+                                                 "circuit-board CSP in parallel.")
+    parser.add_argument("command", choices=["count", "enumerate"])
+    parser.add_argument("problem", choices=sorted(PROBLEMS), help="the kind of problem in the input file")
+    parser.add_argument("filename", help="the input file, in the format described in README.txt")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default: number of CPUs)")
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), default="mrv",
+                        help="named backtracking strategy (default: mrv)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random value ordering")
+    parser.add_argument("--backjump", action="store_true", help="use conflict-directed backjumping")
+    parser.add_argument("--split-factor", type=int, default=8, help="subproblems per worker (default: 8)")
+    parser.add_argument("--bitset", action="store_true", help="store domains as bitmasks")
+    parser.add_argument("--extensional", action="store_true",
+                        help="build the lists of allowable value pairs instead of using the relations directly")
+    parser.add_argument("--model", metavar="PATH", help="load this compiled model of the input file in every worker")
+    parser.add_argument("--stats", action="store_true", help="print the search statistics summed over the workers")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    parts = STRATEGIES[args.strategy]
+    start = time.perf_counter()
+
+    if args.command == "count":
+        result = count_solutions(args.problem, args.filename, parts[0], parts[1], parts[2], args.seed, args.backjump,
+                                 args.workers, args.bitset, args.extensional, args.split_factor, args.model)
+        print("solutions: " + str(result[0]) + " (%.3fs)" % (time.perf_counter() - start))
+        if args.stats:
+            print(", ".join(key + ": " + str(value) for key, value in result[1].items()))
+        return 0
+
+    problem = PROBLEMS[args.problem](args.filename, build=False)
+    count = 0
+    for solution in parallel_solutions(args.problem, args.filename, parts[0], parts[1], parts[2], args.seed,
+                                       args.backjump, args.workers, args.bitset, args.extensional, args.split_factor,
+                                       args.model):
+        problem.print_solution(solution)
+        count += 1
+    print("solutions: " + str(count) + " (%.3fs)" % (time.perf_counter() - start))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
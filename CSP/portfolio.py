@@ -0,0 +1,171 @@
+# Portfolio solver: runs several search configurations on the same problem at once, one process each,
+# and returns the first answer, stopping the other runs
+#   python portfolio.py map planar_1000.txt [--workers 8] [--timeout 60]
+
+import argparse
+import multiprocessing
+import os
+import queue
+import time
+
+from CircuitBoardCSP import CircuitBoardCSP
+from MapColoringCSP import MapColoringCSP
+from backtracking_search import STRATEGIES, solve
+
+PROBLEMS = {"map": MapColoringCSP, "board": CircuitBoardCSP}
+
+# The default portfolio, in the order the workers are given to it: (strategy, backjump).
+# When there are more workers than entries, the list is repeated with the next seeds
+PORTFOLIO = [
+    ("dom_wdeg", False),
+    ("mrv_lcv", False),
+    ("mac", True),
+    ("mrv", False),
+    ("fc", True),
+    ("lcv", False),
+]
+
+# Returns a search configuration: the named strategy's parts (see STRATEGIES), the seed and backjumping
+def configuration(strategy, seed, backjump=False):
+    parts = STRATEGIES[strategy]
+    return {"strategy": strategy, "select": parts[0], "order": parts[1], "inference": parts[2], "seed": seed,
+            "backjump": backjump}
+
+# Returns the default portfolio of the given size
+def default_configurations(size):
+    configurations = []
+    for i in range(size):
+        entry = PORTFOLIO[i % len(PORTFOLIO)]
+        configurations.append(configuration(entry[0], i // len(PORTFOLIO), entry[1]))
+    return configurations
+
+# Solves the problem in the file with every configuration at once, in up to 'workers' processes
+# (more configurations than workers start as the earlier ones finish). Every configuration runs a complete
+# search, so the first one to finish has the answer: the others are terminated as soon as it comes in.
+# Returns a record with the "status" ("solved", "unsatisfiable", "timeout" or "error"), the "solution",
+# the winning "configuration" with its search "stats", and the wall-clock "time"
+# @kind 'map' or 'board'
+# @configurations list of configurations (see configuration()), or None for the default portfolio
+# @workers the number of processes (default: the number of CPUs)
+# @timeout the time limit in seconds, or None
+# @model optional compiled model of the problem file (see 'model_file.py'), which every worker maps instead of
+#   building its own copy of the model
+def solve_portfolio(kind, filename, configurations=None, workers=None, timeout=None, bitset=False,
+                    extensional=False, model=None):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if configurations is None:
+        configurations = default_configurations(workers)
+    workers = min(workers, len(configurations))
+
+    results = multiprocessing.Queue()
+    running = {}
+    next_config = 0
+    errors = []
+    start = time.perf_counter()
+
+    try:
+        while True:
+            while len(running) < workers and next_config < len(configurations):
+                process = multiprocessing.Process(target=child_solve,
+                                                  args=(results, next_config, kind, filename, bitset, extensional,
+                                                        model, configurations[next_config]))
+                process.start()
+                running[next_config] = process
+                next_config += 1
+
+            if len(running) == 0:
+                return {"status": "error", "solution": None, "configuration": None, "errors": errors,
+                        "time": time.perf_counter() - start}
+
+            elapsed = time.perf_counter() - start
+            if timeout is not None and elapsed >= timeout:
+                return {"status": "timeout", "solution": None, "configuration": None, "time": elapsed}
+
+            # Wait in short steps, so that workers that died without reporting are noticed
+            try:
+                index, record = results.get(timeout=0.1)
+            except queue.Empty:
+                for index in list(running):
+                    process = running[index]
+                    if not process.is_alive() and process.exitcode != 0:
+                        running.pop(index).join()
+                        errors.append((configurations[index], "exit code " + str(process.exitcode)))
+                continue
+
+            running.pop(index).join()
+            if record["status"] == "error":
+                errors.append((configurations[index], record["error"]))
+                continue
+
+            record["configuration"] = configurations[index]
+            record["time"] = time.perf_counter() - start
+            return record
+    finally:
+        for process in running.values():
+            process.terminate()
+        for process in running.values():
+            process.join()
+        results.close()
+        results.join_thread()
+
+# Builds the model and solves it with one configuration, reporting (configuration index, record) to the parent
+def child_solve(results, index, kind, filename, bitset, extensional, model, config):
+    try:
+        csp = PROBLEMS[kind](filename, bitset, extensional, model=model).int_csp
+        solution = solve(csp, config["select"], config["order"], config["inference"], config["seed"],
+                         backjump=config.get("backjump", False))
+        record = {"status": "solved" if solution is not None else "unsatisfiable", "solution": solution,
+                  "stats": csp.stats.as_dict()}
+    except Exception as e:
+        record = {"status": "error", "error": repr(e)}
+    results.put((index, record))
+
+def format_configuration(config):
+    s = config["strategy"] + " (select: " + config["select"] + ", order: " + config["order"] + ", inference: " + \
+        config["inference"] + ") seed=" + str(config["seed"])
+    if config.get("backjump", False):
+        s += " backjump"
+    return s
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a map-coloring or circuit-board CSP with a portfolio of "
+                                                 "search configurations running in parallel.")
+    parser.add_argument("problem", choices=sorted(PROBLEMS), help="the kind of problem in the input file")
+    parser.add_argument("filename", help="the input file, in the format described in README.txt")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default: number of CPUs)")
+    parser.add_argument("--strategies", nargs="+", choices=sorted(STRATEGIES),
+                        help="run these strategies with each seed instead of the default portfolio")
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0], help="seeds for --strategies (default: 0)")
+    parser.add_argument("--backjump", action="store_true", help="use backjumping in every --strategies run")
+    parser.add_argument("--timeout", type=float, default=None, help="time limit, in seconds")
+    parser.add_argument("--bitset", action="store_true", help="store domains as bitmasks")
+    parser.add_argument("--extensional", action="store_true",
+                        help="build the lists of allowable value pairs instead of using the relations directly")
+    parser.add_argument("--model", metavar="PATH", help="load this compiled model of the input file in every worker")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    configurations = None
+    if args.strategies is not None:
+        configurations = [configuration(strategy, seed, args.backjump)
+                          for seed in args.seeds for strategy in args.strategies]
+
+    result = solve_portfolio(args.problem, args.filename, configurations, args.workers, args.timeout, args.bitset,
+                             args.extensional, args.model)
+
+    if result["status"] in ("timeout", "error"):
+        print(result["status"])
+        for error in result.get("errors", []):
+            print(format_configuration(error[0]) + ": " + error[1])
+        return 1
+
+    print("\n**** won by " + format_configuration(result["configuration"]) + " in %.3fs ****\n" % result["time"])
+    PROBLEMS[args.problem](args.filename, build=False).print_solution(result["solution"])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,150 @@
+# Command-line entry point for solving map-coloring and circuit-board CSP's with any search configuration
+# e.g. python solve_csp.py map australia_map.txt --strategy mac --select mrv --seed 1
+
+import argparse
+
+from CircuitBoardCSP import CircuitBoardCSP
+from MapColoringCSP import MapColoringCSP
+from RestartPolicy import RestartPolicy
+from SearchStats import print_trace
+from SolutionCache import SolutionCache
+from backtracking_search import INFERENCES, ORDERINGS, SELECTORS, STRATEGIES, solutions
+from caching import solve_cached
+from decomposition import count_decomposed, solve_decomposed
+from model_file import compile_model, file_digest
+
+PROBLEMS = {"map": MapColoringCSP, "board": CircuitBoardCSP}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a map-coloring or circuit-board CSP.")
+    parser.add_argument("problem", choices=sorted(PROBLEMS), help="the kind of problem in the input file")
+    parser.add_argument("filename", help="the input file, in the format described in README.txt")
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), default="basic",
+                        help="named backtracking strategy (default: basic); the options below override its parts")
+    parser.add_argument("--select", choices=sorted(SELECTORS), help="variable selection heuristic")
+    parser.add_argument("--order", choices=sorted(ORDERINGS), help="value ordering heuristic")
+    parser.add_argument("--inference", choices=sorted(INFERENCES), help="inference")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random value ordering")
+    parser.add_argument("--backjump", action="store_true",
+                        help="use conflict-directed backjumping instead of chronological backtracking")
+    parser.add_argument("--restarts", choices=["luby", "geometric"],
+                        help="restart the search with this cutoff sequence, keeping nogoods between runs")
+    parser.add_argument("--restart-unit", type=int, default=100, help="cutoff of the first run (default: 100)")
+    parser.add_argument("--restart-measure", choices=["failures", "nodes"], default="failures",
+                        help="what the restart cutoff counts (default: failures)")
+    parser.add_argument("--bitset", action="store_true", help="store domains as bitmasks")
+    parser.add_argument("--extensional", action="store_true",
+                        help="build the lists of allowable value pairs instead of using the relations directly")
+    parser.add_argument("--pairwise", action="store_true",
+                        help="circuit boards: use binary constraints between every pair of pieces instead of "
+                             "the occupancy-mask packing constraint")
+    parser.add_argument("--symmetry", action="store_true",
+                        help="break the symmetry of interchangeable colors (maps) or identical pieces (boards)")
+    parser.add_argument("--all", action="store_true",
+                        help="print every solution (with --symmetry, one per set of symmetric solutions)")
+    parser.add_argument("--count", action="store_true",
+                        help="count the solutions (with --symmetry, also the symmetric solutions they stand for)")
+    parser.add_argument("--decompose", action="store_true",
+                        help="solve (or count) the connected components separately, trees and nearly-trees "
+                             "without search")
+    parser.add_argument("--cache", metavar="PATH",
+                        help="look the solution up in (and add it to) the persistent solution cache in this file")
+    parser.add_argument("--cache-size", type=int, default=64 * 1024 * 1024,
+                        help="size bound of the cache file, in bytes (default: 64 MB)")
+    parser.add_argument("--compile", metavar="PATH",
+                        help="build the model and write it to this compiled model file instead of solving")
+    parser.add_argument("--model", metavar="PATH",
+                        help="load the model compiled from the input file (with --compile) instead of building it; its "
+                             "symmetry is broken if it was compiled with --symmetry")
+    parser.add_argument("--stats", action="store_true", help="print the search statistics")
+    parser.add_argument("--trace", action="store_true", help="print every search event")
+    args = parser.parse_args(argv)
+    if args.decompose and (args.all or args.symmetry or args.restarts is not None or args.backjump):
+        parser.error("--decompose cannot be combined with --all, --symmetry, --restarts or --backjump")
+    if args.cache is not None and (args.all or args.count or args.decompose or args.symmetry or
+                                   args.restarts is not None or args.trace or args.compile is not None):
+        parser.error("--cache cannot be combined with --all, --count, --decompose, --symmetry, --restarts, --trace "
+                     "or --compile")
+    return args
+
+# Enumerates the solutions, printing them with --all, and prints how many there are. With the symmetry broken,
+# each solution found stands for its whole orbit of symmetric solutions, which are counted too
+def count_solutions(problem, select, order, inference, args):
+    count = 0
+    total = 0
+    for solution in solutions(problem.int_csp, select, order, inference, args.seed, args.backjump):
+        if args.all:
+            problem.print_solution(solution)
+        count += 1
+        total += problem.orbit_size(solution)
+
+    # A model loaded with --model has its symmetry broken if it was compiled with --symmetry
+    if problem.symmetry:
+        print("canonical solutions: " + str(count) + ", solutions: " + str(total))
+    else:
+        print("solutions: " + str(count))
+
+# Solves the problem through the solution cache, which skips building the model and searching on a hit
+def cached_solution(select, order, inference, args):
+    cache = SolutionCache(args.cache, disk_bytes=args.cache_size)
+    try:
+        result = solve_cached(args.problem, args.filename, cache, select, order, inference, args.seed, args.bitset,
+                              args.extensional, args.backjump, not args.pairwise, args.model)
+    finally:
+        cache.close()
+
+    print("\n**** select: " + select + ", order: " + order + ", inference: " + inference + " ****\n")
+    if result[2]:
+        print("(from cache)\n")
+    result[0].print_solution(result[1])
+
+    if args.stats:
+        if result[0].int_csp is not None:
+            print(result[0].int_csp.stats)
+        print("cache: " + str(cache))
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    strategy = STRATEGIES[args.strategy]
+    select = args.select or strategy[0]
+    order = args.order or strategy[1]
+    inference = args.inference or strategy[2]
+
+    if args.cache is not None:
+        cached_solution(select, order, inference, args)
+        return
+
+    if args.problem == "board":
+        problem = CircuitBoardCSP(args.filename, args.bitset, args.extensional, not args.pairwise, args.symmetry,
+                                  model=args.model)
+    else:
+        problem = MapColoringCSP(args.filename, args.bitset, args.extensional, True, args.symmetry, model=args.model)
+
+    if args.compile is not None:
+        size = compile_model(problem.int_csp, args.compile, file_digest(args.filename), problem.symmetry)
+        print("compiled " + args.filename + " to " + args.compile + " (" + str(size) + " bytes)")
+        return
+    if args.trace:
+        problem.int_csp.trace = print_trace
+
+    restarts = None
+    if args.restarts is not None:
+        restarts = RestartPolicy(args.restarts, args.restart_unit, args.restart_measure)
+
+    print("\n**** select: " + select + ", order: " + order + ", inference: " + inference + " ****\n")
+    if args.decompose and args.count:
+        print("solutions: " + str(count_decomposed(problem.int_csp, select, order, inference, args.seed)))
+    elif args.decompose:
+        problem.print_solution(solve_decomposed(problem.int_csp, select, order, inference, args.seed))
+    elif args.all or args.count:
+        count_solutions(problem, select, order, inference, args)
+    else:
+        problem.solution(select, order, inference, args.seed, restarts, args.backjump)
+
+    if args.stats:
+        print(problem.int_csp.stats)
+
+
+if __name__ == "__main__":
+    main()